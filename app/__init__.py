@@ -1,6 +1,7 @@
-from flask import Flask, render_template, jsonify, request, redirect, url_for, flash
+from flask import Flask, stream_template, jsonify, request, redirect, url_for, flash
 from flask_login import current_user
 import os
+import functools
 import threading
 from threading import Lock
 from datetime import datetime
@@ -12,8 +13,9 @@ from update_gacha_data import run_full_process
 # 导入用户系统
 from user_system.auth import init_login_manager
 from user_system.middleware import permission_middleware
+from app.compression import init_compression
 # 导入统计函数
-from app.api.stats import _get_all_pulls, _calculate_dashboard_summary, _calculate_pool_list_and_latest, _calculate_pulls_by_pool, _calculate_pool_details, _calculate_pulls_by_month
+from app.api.stats import _load_dashboard_summary
 
 # 创建更新锁，防止重复触发
 update_lock = {}
@@ -30,6 +32,9 @@ def create_app():
     # 初始化用户系统
     init_login_manager(app)
     
+    # 注册响应压缩
+    init_compression(app)
+    
     # 注册权限中间件
     @app.before_request
     def before_request():
@@ -39,16 +44,13 @@ def create_app():
     
     @app.route('/')
     def index():
-        """主页路由"""
+        """主页路由
+
+        页面骨架立即以流的形式输出；抽卡总览在模板渲染到对应位置时才计算，
+        图表与历史记录表格由浏览器通过统计 API 异步加载。
+        """
         accounts = []
-        gacha_summary = None
-        # 初始化变量，避免未定义错误
-        pool_data = {"pool_list": [], "latest_pool": None}
-        pulls_by_pool_data = []
-        pulls_by_month_data = []
-        latest_pool_details = None
-        gacha_data = {}
-        gacha_summary = None
+        load_summary = None
         
         if current_user.is_authenticated:
             from user_system.directory_service import DirectoryService
@@ -77,51 +79,13 @@ def create_app():
                     'version': metadata.get('version', 'N/A')
                 })
             
-            # 如果存在账号，则获取第一个账号的抽卡统计数据
+            # 如果存在账号，则延迟计算第一个账号的抽卡总览
             if accounts:
-                first_account_uid = accounts[0]['uid']
-                all_pulls, error = _get_all_pulls(username, first_account_uid)
-                if error is None:
-                    gacha_summary = _calculate_dashboard_summary(all_pulls)
-                    
-                    # 获取额外的图表数据
-                    pool_data = _calculate_pool_list_and_latest(all_pulls)
-                    pulls_by_pool_data = _calculate_pulls_by_pool(all_pulls)
-                    latest_pool_name = pool_data.get("latest_pool")
-                    latest_pool_details = None
-                    if latest_pool_name:
-                        latest_pool_details = _calculate_pool_details(all_pulls, latest_pool_name)
-                    
-                    # 获取用于"按月份"分布的数据
-                    pulls_by_month_data = _calculate_pulls_by_month(all_pulls)
-                    
-                    # 获取原始数据用于历史记录表格
-                    users_dir = Path("users")
-                    data_file = users_dir / username / 'accounts' / first_account_uid / 'data.json'
-                    gacha_data = {}
-                    if data_file.exists():
-                        try:
-                            with open(data_file, 'r', encoding='utf-8') as f:
-                                gacha_data = json.load(f)
-                        except (IOError, json.JSONDecodeError):
-                            pass # 如果读取失败，gacha_data 保持为空字典
-                    
-                else:
-                    # 如果获取数据失败，确保这些变量被定义，避免模板渲染错误
-                    pool_data = {"pool_list": [], "latest_pool": None}
-                    pulls_by_pool_data = []
-                    pulls_by_month_data = []
-                    latest_pool_details = None
-                    gacha_data = {}
+                load_summary = functools.partial(_load_dashboard_summary, username, accounts[0]['uid'])
 
-        return render_template('index.html', 
-                             accounts=accounts, 
-                             gacha_summary=gacha_summary,
-                             pool_data=pool_data,
-                             pulls_by_pool_data=pulls_by_pool_data,
-                             pulls_by_month_data=pulls_by_month_data,
-                             latest_pool_details=latest_pool_details,
-                             gacha_data=gacha_data)
+        return stream_template('index.html', 
+                               accounts=accounts, 
+                               load_summary=load_summary)
     
     # 注册用户系统蓝图
     from user_system.auth import auth_bp
@@ -135,6 +99,22 @@ def create_app():
     from app.api.stats import stats_bp
     app.register_blueprint(stats_bp)
     
+    # 注册抽卡历史分页API蓝图
+    from app.api.history import history_bp
+    app.register_blueprint(history_bp)
+    from app.api.query import query_bp
+    app.register_blueprint(query_bp)
+    from app.api.simulate import simulate_bp
+    app.register_blueprint(simulate_bp)
+    from app.api.collection import collection_bp
+    app.register_blueprint(collection_bp)
+    from app.api.export import export_bp
+    app.register_blueprint(export_bp)
+    from app.api.global_stats import global_stats_bp
+    app.register_blueprint(global_stats_bp)
+    from app.api.combined_stats import combined_stats_bp
+    app.register_blueprint(combined_stats_bp)
+    
     # 注册抽卡数据导入API蓝图
     from app.api.gacha_import import gacha_import_bp
     app.register_blueprint(gacha_import_bp)
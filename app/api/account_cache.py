@@ -0,0 +1,129 @@
+import json
+import threading
+from array import array
+from collections import OrderedDict
+from bisect import bisect_left, bisect_right
+from app.api.http_cache import get_data_file, get_data_version
+from app.api.pull import pulls_from_gacha_data
+from app.api.pull_index import PullIndex
+from app.api.pity_state import PityTracker
+
+# 进程内最多缓存的账号数，超出后淘汰最久未使用的账号
+MAX_CACHED_ACCOUNTS = 32
+
+
+class AccountData:
+    """某一数据版本下，一个账号的全部抽卡记录及其派生索引"""
+
+    def __init__(self, version, pulls):
+        self.version = version
+        # 按时间戳升序排列；同一时间戳内保持十连中的原始顺序
+        self.pulls = pulls
+        # 时间戳使用紧凑的 int64 数组保存，供 bisect 定位
+        self.ts_list = array('q', (p.ts for p in pulls))
+
+        self._index = None
+        self._pity_state = None
+        # 派生统计结果（运气评估等），与数据版本共存亡
+        self._aggregates = {}
+
+    def __len__(self):
+        return len(self.pulls)
+
+    @property
+    def index(self):
+        """卡池 / 类型 / 稀有度索引，首次使用时构建，之后随数据版本一起缓存"""
+        if self._index is None:
+            self._index = PullIndex(self.pulls)
+        return self._index
+
+    @property
+    def pity_state(self):
+        """按卡池家族计算的保底状态机，随数据版本缓存"""
+        if self._pity_state is None:
+            self._pity_state = PityTracker().feed(self.pulls)
+        return self._pity_state
+
+    def resume_from(self, previous):
+        """新数据只在旧数据末尾追加记录时，沿用旧版本的保底状态，只处理新增记录"""
+        tracker = previous._pity_state
+        if tracker is not None and tracker.can_resume(self.ts_list):
+            self._pity_state = tracker.copy().feed(self.pulls, tracker.consumed)
+
+    def aggregate(self, name, compute):
+        """返回按名称缓存的派生统计结果，首次请求时调用 compute() 计算"""
+        result = self._aggregates.get(name)
+        if result is None:
+            result = self._aggregates[name] = compute()
+        return result
+
+    def range_bounds(self, ts_from=None, ts_to=None):
+        """返回时间范围 [ts_from, ts_to] 在 pulls 中对应的下标区间 [lo, hi)"""
+        lo = 0 if ts_from is None else bisect_left(self.ts_list, ts_from)
+        hi = len(self.ts_list) if ts_to is None else bisect_right(self.ts_list, ts_to)
+        return lo, max(lo, hi)
+
+    def encode_cursor(self, index):
+        """将下标编码为与数据追加无关的游标：时间戳 + 该时间戳内的偏移"""
+        ts = self.ts_list[index]
+        return f"{ts}-{index - bisect_left(self.ts_list, ts)}"
+
+    def decode_cursor(self, cursor):
+        """将游标还原为下标，格式错误时返回 None"""
+        try:
+            ts, offset = (int(part) for part in cursor.split('-', 1))
+        except (AttributeError, ValueError):
+            return None
+        return bisect_left(self.ts_list, ts) + offset
+
+
+def _load_pulls(data_file):
+    """读取并展开 data.json，返回按时间升序排列的 Pull 列表"""
+    with open(data_file, 'r', encoding='utf-8') as f:
+        gacha_data = json.load(f)
+    return pulls_from_gacha_data(gacha_data)
+
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def get_account_data(username, game_uid):
+    """获取账号数据，同一数据版本只解析一次
+
+    Returns:
+        (AccountData, None) 或 (None, (错误信息, 状态码))
+    """
+    key = (username, game_uid)
+    version, _ = get_data_version(username, game_uid)
+    if version is None:
+        return None, ({"error": "Data file not found"}, 404)
+
+    with _cache_lock:
+        cached = _cache.get(key)
+        if cached is not None and cached.version == version:
+            _cache.move_to_end(key)
+            return cached, None
+
+    try:
+        pulls = _load_pulls(get_data_file(username, game_uid))
+    except (IOError, json.JSONDecodeError, KeyError, TypeError, ValueError) as e:
+        return None, ({"error": f"Failed to read or parse data file: {str(e)}"}, 500)
+
+    account_data = AccountData(version, pulls)
+    if cached is not None:
+        account_data.resume_from(cached)
+    with _cache_lock:
+        _cache[key] = account_data
+        _cache.move_to_end(key)
+        while len(_cache) > MAX_CACHED_ACCOUNTS:
+            _cache.popitem(last=False)
+    return account_data, None
+
+
+def invalidate_account(username, game_uid=None):
+    """移除账号（或用户全部账号）的缓存"""
+    with _cache_lock:
+        for key in list(_cache):
+            if key[0] == username and (game_uid is None or key[1] == game_uid):
+                del _cache[key]
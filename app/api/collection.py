@@ -0,0 +1,124 @@
+import json
+from flask import Blueprint, jsonify, request
+from flask_login import login_required, current_user
+from app.api.account_cache import get_account_data
+from app.api.http_cache import get_data_file
+from solvers.operator_catalog import get_operator_catalog, popcount
+
+collection_bp = Blueprint('collection_bp', __name__)
+
+COLLECTION_RARITIES = (6, 5, 4, 3)
+
+# 位图集合运算
+SET_OPERATIONS = {
+    "intersection": lambda a, b: a & b,
+    "union": lambda a, b: a | b,
+    "difference": lambda a, b: a & ~b,
+    "symmetric_difference": lambda a, b: a ^ b,
+}
+
+
+def _owned_bits(username, game_uid):
+    """读取账号拥有的干员位图（位序号为进程内的干员 ID）
+
+    优先使用保存数据时写入 metadata.json 的干员名列表；旧账号尚未写入
+    （或仍是旧版本的十六进制位图）时，由抽卡记录计算一次并随数据版本缓存。
+
+    Returns:
+        (位图, None) 或 (None, (错误信息, 状态码))
+    """
+    catalog = get_operator_catalog()
+    metadata_file = get_data_file(username, game_uid).with_name('metadata.json')
+    try:
+        with open(metadata_file, 'r', encoding='utf-8') as f:
+            owned = json.load(f).get("owned_operators")
+        if isinstance(owned, list):
+            bits = catalog.bitset(owned)
+            catalog.save()
+            return bits, None
+    except (IOError, json.JSONDecodeError):
+        pass
+
+    account_data, error = get_account_data(username, game_uid)
+    if error:
+        return None, error
+    bits = account_data.aggregate(
+        "owned_operators", lambda: catalog.bitset(account_data.index.by_char))
+    catalog.save()
+    return bits, None
+
+
+def _calculate_completeness(bits):
+    """按稀有度统计图鉴完成度 (核心逻辑)
+
+    total、owned 与 missing 只按随代码发布的干员目录计算：运行时登记的目录外干员来自
+    所有用户的数据，不能出现在单个账号的结果中。账号自己拥有的目录外干员单独列在
+    uncatalogued 中，不计入完成度。
+    """
+    catalog = get_operator_catalog()
+    curated = catalog.curated_mask()
+    result = []
+    for rarity in COLLECTION_RARITIES:
+        rarity_mask = catalog.rarity_mask(rarity)
+        mask = rarity_mask & curated
+        total = popcount(mask)
+        owned = popcount(bits & mask)
+        result.append({
+            "rarity": rarity,
+            "owned": owned,
+            "total": total,
+            "completeness": owned / total if total else 0,
+            "missing": catalog.names_in(mask & ~bits),
+            "uncatalogued": catalog.names_in(bits & rarity_mask & ~curated)
+        })
+    return result
+
+
+@collection_bp.route('/api/collection/<string:game_uid>')
+@login_required
+def get_collection(game_uid):
+    """账号拥有的干员与各稀有度图鉴完成度 (API路由)"""
+    bits, error = _owned_bits(current_user.username, game_uid)
+    if error:
+        return jsonify(error[0]), error[1]
+    catalog = get_operator_catalog()
+    return jsonify({
+        "owned_count": popcount(bits),
+        "owned": catalog.names_in(bits),
+        "by_rarity": _calculate_completeness(bits),
+        # 干员目录的覆盖情况：curated 为随代码发布的目录中的干员数，uncatalogued 为账号拥有的目录外干员数
+        "catalog": {"curated": catalog.curated, "uncatalogued": popcount(bits & ~catalog.curated_mask())}
+    })
+
+
+@collection_bp.route('/api/collection/compare')
+@login_required
+def compare_collections():
+    """对当前用户的多个账号的干员集合做集合运算 (API路由)
+
+    参数：accounts=uid1,uid2[,...]，op=intersection/union/difference/symmetric_difference
+    difference 为第一个账号减去其余账号。
+    """
+    accounts = [uid.strip() for uid in request.args.get('accounts', '').split(',') if uid.strip()]
+    operation = request.args.get('op', 'intersection')
+    if len(accounts) < 2:
+        return jsonify({"error": "At least two accounts are required"}), 400
+    if operation not in SET_OPERATIONS:
+        return jsonify({"error": f"Unsupported op: {operation}"}), 400
+
+    combine = SET_OPERATIONS[operation]
+    per_account = []
+    result = None
+    for game_uid in accounts:
+        bits, error = _owned_bits(current_user.username, game_uid)
+        if error:
+            return jsonify(error[0]), error[1]
+        per_account.append({"account_uid": game_uid, "owned_count": popcount(bits)})
+        result = bits if result is None else combine(result, bits)
+
+    return jsonify({
+        "op": operation,
+        "accounts": per_account,
+        "count": popcount(result),
+        "operators": get_operator_catalog().names_in(result)
+    })
@@ -0,0 +1,145 @@
+import heapq
+import threading
+from collections import Counter, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from flask import Blueprint, jsonify
+from flask_login import login_required, current_user
+from app.api.account_cache import get_account_data
+from app.api.pity_state import LIMITED, STANDARD, JOINT_OP
+from app.api.stats import _account_dashboard_summary, POOL_TYPE_KEYS
+from user_system.catalog import get_user_catalog
+
+combined_stats_bp = Blueprint('combined_stats_bp', __name__)
+
+# 同时加载的账号数上限
+MAX_LOAD_WORKERS = 8
+# 合并总览中列出的最近六星数量
+RECENT_SIX_STARS = 20
+# 进程内最多缓存的用户合并结果数
+MAX_CACHED_COMBINED = 32
+
+
+def _load_account(username, game_uid):
+    """加载账号数据并计算其统计结果（在线程池中执行；数据版本不变时两者都直接取自缓存）"""
+    account_data, error = get_account_data(username, game_uid)
+    if error:
+        return game_uid, None
+    _account_dashboard_summary(account_data)
+    return game_uid, account_data
+
+
+def load_accounts(username, game_uids):
+    """并行加载用户的多个账号，返回 [(游戏UID, AccountData)]（跳过没有数据的账号，保持 game_uids 的顺序）"""
+    if len(game_uids) <= 1:
+        results = [_load_account(username, game_uid) for game_uid in game_uids]
+    else:
+        with ThreadPoolExecutor(max_workers=min(len(game_uids), MAX_LOAD_WORKERS)) as executor:
+            results = list(executor.map(lambda game_uid: _load_account(username, game_uid), game_uids))
+    return [(game_uid, account_data) for game_uid, account_data in results if account_data is not None]
+
+
+def merge_account_pulls(accounts):
+    """k 路归并各账号按时间升序排列的抽卡记录，逐条产出 (游戏UID, Pull)，整体按时间升序"""
+    streams = [((game_uid, pull) for pull in account_data.pulls) for game_uid, account_data in accounts]
+    return heapq.merge(*streams, key=lambda item: item[1].ts)
+
+
+def _rarity_stats(rarity_counts, total):
+    keys = (("six_star", 6), ("five_star", 5), ("four_star", 4), ("three_star", 3))
+    return (
+        {name: rarity_counts.get(rarity, 0) for name, rarity in keys},
+        {name: rarity_counts.get(rarity, 0) / total if total else 0 for name, rarity in keys}
+    )
+
+
+def _calculate_combined_summary(accounts):
+    """合并多个账号的统计 (核心逻辑)
+
+    各账号的保底相互独立，平均出货抽数由各账号的六星间隔合并计算；
+    月度抽数、卡池抽数与最近六星来自按时间归并后的全部抽卡记录，只需一次顺序遍历。
+    """
+    side_by_side = []
+    intervals = {LIMITED: [], STANDARD: [], JOINT_OP: []}
+    for game_uid, account_data in accounts:
+        summary = _account_dashboard_summary(account_data)
+        for pool_type, pool_intervals in account_data.pity_state.intervals.items():
+            intervals.setdefault(pool_type, []).extend(pool_intervals)
+        side_by_side.append({
+            "uid": game_uid,
+            "total_pulls": summary["global_stats"]["total_pulls"],
+            "rarity_counts": summary["global_stats"]["rarity_counts"],
+            "rarity_prob": summary["global_stats"]["rarity_prob"],
+            **{key: {field: summary[key][field] for field in ("total_pulls", "average_pity", "current_pity")}
+               for key, _ in POOL_TYPE_KEYS},
+            "last_pull_ts": account_data.pulls[-1].ts if account_data.pulls else None
+        })
+
+    rarity_counts = Counter()
+    month_counts = Counter()
+    pool_counts = Counter()
+    recent_six_stars = []
+    for game_uid, pull in merge_account_pulls(accounts):
+        rarity_counts[pull.rarity] += 1
+        month_counts[datetime.fromtimestamp(pull.ts).strftime('%Y-%m')] += 1
+        pool_counts[pull.pool_name] += 1
+        if pull.rarity == 6:
+            recent_six_stars.append((game_uid, pull))
+    recent_six_stars = recent_six_stars[-RECENT_SIX_STARS:]
+
+    total = sum(rarity_counts.values())
+    counts, probs = _rarity_stats(rarity_counts, total)
+    combined = {
+        "accounts": len(accounts),
+        "total_pulls": total,
+        "rarity_counts": counts,
+        "rarity_prob": probs,
+        **{key: {"total_pulls": sum(account[key]["total_pulls"] for account in side_by_side),
+                 "six_stars": len(intervals[pool_type]),
+                 "average_pity": sum(intervals[pool_type]) / len(intervals[pool_type]) if intervals[pool_type] else 0}
+           for key, pool_type in POOL_TYPE_KEYS},
+        "pulls_by_month": [{"name": name, "value": value} for name, value in sorted(month_counts.items())],
+        "pulls_by_pool": [{"name": name, "value": value} for name, value in pool_counts.most_common()],
+        "recent_six_stars": [{"uid": game_uid, "char_name": pull.char_name, "pool_name": pull.pool_name,
+                              "is_new": pull.is_new, "ts": pull.ts}
+                             for game_uid, pull in reversed(recent_six_stars)]
+    }
+    return {"combined": combined, "accounts": side_by_side}
+
+
+_combined_cache = OrderedDict()
+_combined_cache_lock = threading.Lock()
+
+
+def load_combined_summary(username):
+    """计算用户全部账号的合并统计，无数据时返回 None
+
+    结果按各账号的数据版本缓存：任一账号数据变化、增加或删除账号后才重新归并。
+    """
+    accounts = load_accounts(username, get_user_catalog().user_accounts(username))
+    if not accounts:
+        return None
+    versions = tuple((game_uid, account_data.version) for game_uid, account_data in accounts)
+    with _combined_cache_lock:
+        cached = _combined_cache.get(username)
+        if cached is not None and cached[0] == versions:
+            _combined_cache.move_to_end(username)
+            return cached[1]
+
+    result = _calculate_combined_summary(accounts)
+    with _combined_cache_lock:
+        _combined_cache[username] = (versions, result)
+        _combined_cache.move_to_end(username)
+        while len(_combined_cache) > MAX_CACHED_COMBINED:
+            _combined_cache.popitem(last=False)
+    return result
+
+
+@combined_stats_bp.route('/api/stats/combined')
+@login_required
+def get_combined_summary():
+    """当前用户全部账号的合并统计与各账号并列对比 (API路由)"""
+    result = load_combined_summary(current_user.username)
+    if result is None:
+        return jsonify({"error": "No account data found"}), 404
+    return jsonify(result)
@@ -0,0 +1,168 @@
+import csv
+import io
+import json
+from flask import Blueprint, Response, jsonify, request, stream_with_context
+from flask_login import login_required, current_user
+from app.api.http_cache import get_data_file, conditional_data_response
+from solvers.json_stream import iter_json_object
+from solvers.record_merge import record_key
+from user_system.middleware import admin_required
+from user_system.catalog import get_user_catalog
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+except ImportError:  # pyarrow 为可选依赖，未安装时不提供 arrow 格式
+    pa = None
+
+export_bp = Blueprint('export_bp', __name__)
+
+# 每行一次抽卡；gacha_ts 为毫秒级记录键，pos 为该次抽卡在记录中的位置
+EXPORT_COLUMNS = ("gacha_ts", "ts", "pos", "pool_name", "pool_type", "char_name", "rarity", "is_new")
+ACCOUNT_COLUMNS = ("username", "account_uid")
+
+# 攒够这么多行才向客户端输出一次，避免逐行产生过多的小块
+EXPORT_BATCH_ROWS = 4096
+
+EXPORT_MIMETYPES = {
+    "jsonl": "application/x-ndjson",
+    "csv": "text/csv",
+    "arrow": "application/vnd.apache.arrow.stream",
+}
+
+
+def _export_formats():
+    return ["jsonl", "csv", "arrow"] if pa is not None else ["jsonl", "csv"]
+
+
+def iter_account_rows(username, game_uid, prefix=()):
+    """从 data.json 流式读取记录并逐行展开（按时间倒序），内存占用与文件大小无关"""
+    data_file = get_data_file(username, game_uid)
+    with open(data_file, 'rb') as f:
+        for ts, record in iter_json_object(f):
+            gacha_ts = record_key(ts)
+            pool_name, pool_type = record["p"], record["pt"]
+            for pos, (char_name, rarity, is_new) in enumerate(record["c"]):
+                yield prefix + (gacha_ts, gacha_ts // 1000, pos, pool_name, pool_type,
+                                char_name, rarity, 1 if is_new else 0)
+
+
+def iter_all_account_rows():
+    """依次导出用户目录索引中的所有账号，每行前加上用户名与游戏UID"""
+    for username, game_uid, _ in get_user_catalog().all_accounts():
+        if get_data_file(username, game_uid).exists():
+            yield from iter_account_rows(username, game_uid, (username, game_uid))
+
+
+def _batched(rows):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= EXPORT_BATCH_ROWS:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _encode_jsonl(rows, columns):
+    for batch in _batched(rows):
+        yield ''.join(json.dumps(dict(zip(columns, row)), ensure_ascii=False) + '\n' for row in batch)
+
+
+def _encode_csv(rows, columns):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\n')
+    writer.writerow(columns)
+    for batch in _batched(rows):
+        writer.writerows(batch)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+class _ChunkSink(io.RawIOBase):
+    """收集 Arrow IPC 写入的字节，按批次取出后发送给客户端"""
+
+    def __init__(self):
+        self.chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def _encode_arrow(rows, columns):
+    """输出 Arrow IPC 流格式，每批行一个 RecordBatch"""
+    string_columns = {"username", "account_uid", "pool_name", "char_name"}
+    schema = pa.schema([(name, pa.string() if name in string_columns else pa.int64()) for name in columns])
+    sink = _ChunkSink()
+    with pa.ipc.new_stream(sink, schema) as writer:
+        for batch in _batched(rows):
+            arrays = [pa.array(values, type=field.type) for values, field in zip(zip(*batch), schema)]
+            writer.write_batch(pa.record_batch(arrays, schema=schema))
+            yield sink.drain()
+    yield sink.drain()
+
+
+ENCODERS = {
+    "jsonl": _encode_jsonl,
+    "csv": _encode_csv,
+    "arrow": _encode_arrow,
+}
+
+
+def _export_response(rows, columns, export_format, filename):
+    body = ENCODERS[export_format](rows, columns)
+    response = Response(stream_with_context(body), mimetype=EXPORT_MIMETYPES[export_format])
+    response.headers['Content-Disposition'] = f'attachment; filename="{filename}.{export_format}"'
+    return response
+
+
+def _requested_format():
+    """读取 format 参数，不支持时返回 (None, 错误响应)"""
+    export_format = request.args.get('format', 'jsonl')
+    if export_format not in _export_formats():
+        if export_format == 'arrow':
+            return None, (jsonify({"error": "Arrow export requires pyarrow"}), 400)
+        return None, (jsonify({"error": f"Unsupported format: {export_format}"}), 400)
+    return export_format, None
+
+
+@export_bp.route('/api/export/<string:game_uid>')
+@login_required
+@conditional_data_response
+def export_account(game_uid):
+    """流式导出当前用户一个账号的全部抽卡记录 (API路由)
+
+    参数：format=jsonl/csv/arrow（arrow 需要安装 pyarrow）
+    """
+    export_format, error = _requested_format()
+    if error:
+        return error
+    username = current_user.username
+    if not get_data_file(username, game_uid).exists():
+        return jsonify({"error": "Data file not found for this account"}), 404
+    return _export_response(iter_account_rows(username, game_uid), EXPORT_COLUMNS,
+                            export_format, f"gacha_{game_uid}")
+
+
+@export_bp.route('/admin/api/export')
+@admin_required
+def export_all_accounts():
+    """流式导出所有用户所有账号的抽卡记录，仅限管理员 (API路由)"""
+    export_format, error = _requested_format()
+    if error:
+        return error
+    return _export_response(iter_all_account_rows(), ACCOUNT_COLUMNS + EXPORT_COLUMNS,
+                            export_format, "gacha_all_accounts")
@@ -1,10 +1,9 @@
 import json
-import os
-from flask import Blueprint, request, jsonify, current_app
+from flask import Blueprint, request, jsonify
 from flask_login import login_required, current_user
 from pathlib import Path
-from solvers.gacha_data_importer import import_gacha_data
-import tempfile
+from solvers.gacha_data_importer import stream_import_gacha_data, MAX_IMPORT_BYTES
+from solvers.json_stream import SizeLimitError
 
 # 创建蓝图
 gacha_import_bp = Blueprint('gacha_import_bp', __name__)
@@ -12,9 +11,15 @@ gacha_import_bp = Blueprint('gacha_import_bp', __name__)
 @gacha_import_bp.route('/api/import/gacha_data/<string:account_uid>', methods=['POST'])
 @login_required
 def import_gacha_data_api(account_uid):
-    """导入抽卡数据API接口"""
-    temp_file_path = None
+    """导入抽卡数据API接口
+
+    上传文件直接以流的方式逐条解析并合并，不再先落地为临时文件或整体载入内存。
+    """
     try:
+        # 请求体超过上限时直接拒绝，不读取内容
+        if request.content_length is not None and request.content_length > MAX_IMPORT_BYTES:
+            return jsonify({'success': False, 'message': f'文件过大，最大支持 {MAX_IMPORT_BYTES // (1024 * 1024)} MB'}), 413
+        
         # 检查是否有文件上传
         if 'file' not in request.files:
             return jsonify({'success': False, 'message': '没有上传文件'}), 400
@@ -37,34 +42,16 @@ def import_gacha_data_api(account_uid):
         if not account_path.exists():
             return jsonify({'success': False, 'message': '账号不存在'}), 404
         
-        # 创建临时文件来保存上传的文件
-        temp_file_path = tempfile.mktemp(suffix='.json')
-        file.save(temp_file_path)
-        
-        # 目标文件路径
-        target_file_path = account_path / "data.json"
-        
-        # 输出文件路径（覆盖原文件）
-        output_file_path = str(target_file_path)
-        
-        # 调用导入函数
-        success = import_gacha_data(
-            temp_file_path,  # 源文件路径（临时文件）
-            str(target_file_path),  # 目标文件路径
-            output_file_path  # 输出文件路径
-        )
-        
-        if success:
-            return jsonify({'success': True, 'message': '数据导入成功'}), 200
-        else:
-            return jsonify({'success': False, 'message': '数据导入失败'}), 500
+        result = stream_import_gacha_data(file.stream, username, account_uid)
+        return jsonify({
+            'success': True,
+            'message': f"数据导入成功：新增 {result['imported']} 条，跳过重复 {result['skipped']} 条",
+            **result
+        }), 200
                 
+    except SizeLimitError as e:
+        return jsonify({'success': False, 'message': str(e)}), 413
+    except (ValueError, json.JSONDecodeError) as e:
+        return jsonify({'success': False, 'message': f'文件格式错误: {str(e)}'}), 400
     except Exception as e:
         return jsonify({'success': False, 'message': f'服务器错误: {str(e)}'}), 500
-    finally:
-        # 确保临时文件被删除
-        if temp_file_path and os.path.exists(temp_file_path):
-            try:
-                os.unlink(temp_file_path)
-            except:
-                pass  # 忽略删除失败的情况
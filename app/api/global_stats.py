@@ -0,0 +1,190 @@
+import json
+import multiprocessing
+import os
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from flask import Blueprint, jsonify, request
+from app.api.http_cache import get_data_file, get_data_version
+from app.api.pull import pulls_from_gacha_data
+from app.api.pity_state import PityTracker
+from user_system.middleware import admin_required
+from user_system.catalog import get_user_catalog, USERS_BASE_PATH
+from solvers.file_lock import read_json, atomic_write_json
+
+global_stats_bp = Blueprint('global_stats_bp', __name__)
+
+# 各账号统计结果的持久化缓存，服务重启后仍只需重新计算数据有变化的账号
+GLOBAL_STATS_CACHE_PATH = os.path.join(USERS_BASE_PATH, ".global_stats.json")
+GLOBAL_STATS_CACHE_VERSION = 1
+
+# 需要重新计算的账号少于这个数量时直接在当前进程计算，不启动进程池
+MIN_PARALLEL_ACCOUNTS = 4
+# 平均出货抽数分布的分组宽度
+PITY_BUCKET_WIDTH = 10
+DEFAULT_TOP_BANNERS = 10
+
+
+def scan_account(username, game_uid, version):
+    """计算单个账号的统计结果（在进程池的子进程中执行，只读取数据文件）
+
+    Returns:
+        (用户名, 游戏UID, 结果)；结果为 None 表示数据文件无法读取
+    """
+    try:
+        with open(get_data_file(username, game_uid), 'r', encoding='utf-8') as f:
+            pulls = pulls_from_gacha_data(json.load(f))
+    except (IOError, json.JSONDecodeError, KeyError, TypeError, ValueError):
+        return username, game_uid, None
+
+    pity_state = PityTracker().feed(pulls)
+    intervals = [pity for pool_intervals in pity_state.intervals.values() for pity in pool_intervals]
+    return username, game_uid, {
+        "version": version,
+        "pull_count": len(pulls),
+        "rarity_counts": dict(Counter(str(pull.rarity) for pull in pulls)),
+        "pity_sum": sum(intervals),
+        "pity_count": len(intervals),
+        "pulls_by_pool": dict(Counter(pull.pool_name for pull in pulls))
+    }
+
+
+def _scan_account_args(args):
+    return scan_account(*args)
+
+
+class GlobalStatsCache:
+    """全站统计的账号级缓存：{用户名: {游戏UID: 统计结果}}，结果带有计算时的数据版本
+
+    每次刷新只 stat 各账号的 data.json，版本变化或新增的账号交给进程池重新计算，
+    已删除的账号从缓存中移除。缓存文件以临时文件 + 原子替换的方式写入。
+    """
+
+    def __init__(self, cache_path=GLOBAL_STATS_CACHE_PATH):
+        self.cache_path = cache_path
+        self.accounts = self._load()
+        self._lock = threading.Lock()
+
+    def _load(self):
+        cache = read_json(self.cache_path)
+        if cache.get("version") != GLOBAL_STATS_CACHE_VERSION:
+            return {}
+        return cache.get("accounts", {})
+
+    def _save(self):
+        atomic_write_json(self.cache_path, {"version": GLOBAL_STATS_CACHE_VERSION, "accounts": self.accounts})
+
+    def refresh(self, workers=None):
+        """使缓存与当前数据一致，返回 (账号统计列表, 重新计算的账号数)"""
+        with self._lock:
+            current = {}
+            stale = []
+            for username, game_uid, _ in get_user_catalog().all_accounts():
+                version, _ = get_data_version(username, game_uid)
+                if version is None:
+                    continue
+                current.setdefault(username, {})
+                cached = self.accounts.get(username, {}).get(game_uid)
+                if cached is not None and cached["version"] == version:
+                    current[username][game_uid] = cached
+                else:
+                    stale.append((username, game_uid, version))
+
+            if len(stale) >= MIN_PARALLEL_ACCOUNTS:
+                # 在 waitress 的工作线程中调用：fork 多线程进程时子进程可能继承被其他线程持有的锁而死锁，
+                # 因此使用 spawn 启动全新的解释器
+                with ProcessPoolExecutor(max_workers=workers,
+                                         mp_context=multiprocessing.get_context("spawn")) as executor:
+                    results = list(executor.map(_scan_account_args, stale, chunksize=4))
+            else:
+                results = [scan_account(*args) for args in stale]
+            rescanned = 0
+            for username, game_uid, result in results:
+                if result is not None:
+                    current[username][game_uid] = result
+                    rescanned += 1
+
+            changed = bool(stale) or current != self.accounts
+            self.accounts = current
+            if changed:
+                self._save()
+            return [result for accounts in current.values() for result in accounts.values()], rescanned
+
+
+def combine_account_stats(account_stats, top_banners=DEFAULT_TOP_BANNERS):
+    """合并各账号的统计结果：总抽数、六星出率、平均出货抽数分布与抽数最多的卡池"""
+    total_pulls = sum(stats["pull_count"] for stats in account_stats)
+    rarity_counts = Counter()
+    pulls_by_pool = Counter()
+    accounts_by_pool = Counter()
+    pity_sum = pity_count = 0
+    average_pities = []
+    for stats in account_stats:
+        rarity_counts.update({int(rarity): count for rarity, count in stats["rarity_counts"].items()})
+        pulls_by_pool.update(stats["pulls_by_pool"])
+        accounts_by_pool.update(stats["pulls_by_pool"].keys())
+        pity_sum += stats["pity_sum"]
+        pity_count += stats["pity_count"]
+        if stats["pity_count"]:
+            average_pities.append(stats["pity_sum"] / stats["pity_count"])
+
+    buckets = Counter(int(pity // PITY_BUCKET_WIDTH) for pity in average_pities)
+    average_pities.sort()
+    return {
+        "accounts": len(account_stats),
+        "total_pulls": total_pulls,
+        "rarity_counts": {
+            "six_star": rarity_counts.get(6, 0),
+            "five_star": rarity_counts.get(5, 0),
+            "four_star": rarity_counts.get(4, 0),
+            "three_star": rarity_counts.get(3, 0)
+        },
+        "six_star_rate": rarity_counts.get(6, 0) / total_pulls if total_pulls else 0,
+        "average_pity": pity_sum / pity_count if pity_count else 0,
+        "average_pity_distribution": {
+            "accounts": len(average_pities),
+            "median": average_pities[len(average_pities) // 2] if average_pities else None,
+            "buckets": [{"from": bucket * PITY_BUCKET_WIDTH + 1, "to": (bucket + 1) * PITY_BUCKET_WIDTH,
+                         "accounts": count} for bucket, count in sorted(buckets.items())]
+        },
+        "top_banners": [{"name": name, "pulls": pulls, "accounts": accounts_by_pool[name]}
+                        for name, pulls in pulls_by_pool.most_common(top_banners)]
+    }
+
+
+_stats_cache = None
+_stats_cache_lock = threading.Lock()
+
+
+def get_global_stats_cache():
+    """返回进程内共享的全站统计缓存"""
+    global _stats_cache
+    if _stats_cache is None:
+        with _stats_cache_lock:
+            if _stats_cache is None:
+                _stats_cache = GlobalStatsCache()
+    return _stats_cache
+
+
+@global_stats_bp.route('/admin/api/global_stats')
+@admin_required
+def get_global_stats():
+    """全站所有用户所有账号的汇总统计，仅限管理员 (API路由)
+
+    参数：top=返回的卡池数量（默认 10）
+    """
+    top_banners = request.args.get('top', DEFAULT_TOP_BANNERS, type=int)
+    if top_banners < 1:
+        return jsonify({"error": "top must be a positive integer"}), 400
+
+    start = time.perf_counter()
+    account_stats, rescanned = get_global_stats_cache().refresh()
+    result = combine_account_stats(account_stats, top_banners)
+    result["users"] = len(get_user_catalog().usernames())
+    result["scan"] = {
+        "rescanned_accounts": rescanned,
+        "cached_accounts": len(account_stats) - rescanned,
+        "elapsed_ms": round((time.perf_counter() - start) * 1000, 1)
+    }
+    return jsonify(result)
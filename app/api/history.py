@@ -0,0 +1,205 @@
+import heapq
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+from flask import Blueprint, jsonify, request
+from flask_login import login_required, current_user
+from app.api.account_cache import get_account_data
+from app.api.http_cache import conditional_data_response
+
+history_bp = Blueprint('history_bp', __name__)
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+def _parse_time(value, end_of_day=False):
+    """解析时间参数：支持 Unix 秒级时间戳或 YYYY-MM-DD / ISO 格式日期"""
+    if value is None or value == '':
+        return None
+    if value.isdigit():
+        return int(value)
+    parsed = datetime.fromisoformat(value)
+    if end_of_day and len(value) == 10:
+        parsed = parsed.replace(hour=23, minute=59, second=59)
+    return int(parsed.timestamp())
+
+
+def _parse_rarities(value):
+    """解析稀有度集合参数，例如 "5,6" """
+    if not value:
+        return None
+    return {int(r) for r in value.split(',') if r.strip()}
+
+
+def _build_predicate(search=None):
+    """构造自由文本搜索的逐条判断函数；没有搜索词时返回 None
+
+    卡池与稀有度筛选由索引生成候选下标，只有干员名 / 卡池名的子串搜索无法走索引，
+    需要逐条检查，此时计数与翻页为 O(n)。
+    """
+    if not search:
+        return None
+
+    def predicate(pull):
+        return search in pull.char_name or search in pull.pool_name
+    return predicate
+
+
+def _filtered_positions(account_data, pool_name=None, rarities=None):
+    """整个历史中满足卡池与稀有度条件的下标数组（升序），随数据版本缓存
+
+    多个稀有度的下标数组通过归并合并；同时指定卡池时再按稀有度过滤卡池索引。
+    不存在的卡池直接返回空数组且不缓存，任意卡池名不会占用缓存。
+    """
+    if pool_name and pool_name not in account_data.index.by_pool:
+        return array('i')
+
+    def build():
+        pull_index = account_data.index
+        if pool_name:
+            positions = pull_index.pool_positions(pool_name)
+            if rarities:
+                pulls = account_data.pulls
+                positions = array('i', (i for i in positions if pulls[i].rarity in rarities))
+            return positions
+        if len(rarities) == 1:
+            return pull_index.rarity_positions(next(iter(rarities)))
+        return array('i', heapq.merge(*(pull_index.rarity_positions(r) for r in rarities)))
+
+    return account_data.aggregate(("history_filter", pool_name, frozenset(rarities or ())), build)
+
+
+def _candidate_positions(account_data, lo, hi, pool_name=None, rarities=None):
+    """返回候选记录下标（升序序列）
+
+    指定卡池或稀有度时取缓存的索引下标数组落在 [lo, hi) 内的部分，
+    数量即为 len()，页首可直接定位，复杂度为 O(log n + 页大小)。
+    """
+    if pool_name or rarities:
+        return account_data.index.slice_positions(_filtered_positions(account_data, pool_name, rarities), lo, hi)
+    return range(lo, hi)
+
+
+def _serialize_pull(pull):
+    return {
+        "ts": pull.ts,
+        "time": datetime.fromtimestamp(pull.ts).strftime('%Y-%m-%d %H:%M:%S'),
+        "pool_name": pull.pool_name,
+        "pool_type": pull.pool_type,
+        "char_name": pull.char_name,
+        "rarity": pull.rarity,
+        "is_new": pull.is_new
+    }
+
+
+def _iter_candidates(candidates, start, descending):
+    """从下标 start 开始按指定方向遍历候选下标，定位起点为 O(log n)"""
+    if descending:
+        k = bisect_right(candidates, start) - 1
+        return (candidates[i] for i in range(k, -1, -1))
+    k = bisect_left(candidates, start)
+    return (candidates[i] for i in range(k, len(candidates)))
+
+
+def _collect_page(account_data, candidates, start, descending, predicate, limit, skip=0):
+    """从 start 开始收集一页记录，先跳过 skip 条匹配记录
+
+    Returns:
+        (记录列表, 下一条待返回记录的下标或 None)
+    """
+    pulls = account_data.pulls
+    page = []
+    for index in _iter_candidates(candidates, start, descending):
+        pull = pulls[index]
+        if predicate is not None and not predicate(pull):
+            continue
+        if skip:
+            skip -= 1
+            continue
+        if len(page) == limit:
+            return page, index
+        page.append(pull)
+    return page, None
+
+
+def _count_matches(account_data, candidates, predicate):
+    """统计满足条件的记录数；没有搜索词时为 O(1)"""
+    if predicate is None:
+        return len(candidates)
+    pulls = account_data.pulls
+    return sum(1 for index in candidates if predicate(pulls[index]))
+
+
+def _datatables_response(account_data, candidates, predicate):
+    """处理 DataTables 服务器端处理协议 (draw/start/length)"""
+    draw = request.args.get('draw', type=int, default=0)
+    start = max(request.args.get('start', type=int, default=0), 0)
+    length = request.args.get('length', type=int, default=DEFAULT_PAGE_SIZE)
+    if length is None or length < 0 or length > MAX_PAGE_SIZE:
+        length = MAX_PAGE_SIZE
+    descending = request.args.get('order[0][dir]', 'desc') != 'asc'
+
+    page = []
+    if predicate is None:
+        # 无搜索词时可直接定位到页首，O(log n + page)
+        k = len(candidates) - 1 - start if descending else start
+        if 0 <= k < len(candidates):
+            page, _ = _collect_page(account_data, candidates, candidates[k], descending, None, length)
+    elif len(candidates):
+        # 自由文本搜索只能逐条检查并跳过前 start 条匹配记录
+        first = candidates[-1] if descending else candidates[0]
+        page, _ = _collect_page(account_data, candidates, first, descending, predicate, length, skip=start)
+
+    return jsonify({
+        "draw": draw,
+        "recordsTotal": len(account_data),
+        "recordsFiltered": _count_matches(account_data, candidates, predicate),
+        "data": [_serialize_pull(p) for p in page]
+    })
+
+
+@history_bp.route('/api/history/<string:game_uid>')
+@login_required
+@conditional_data_response
+def get_history(game_uid):
+    """按游标分页返回抽卡历史，支持卡池、稀有度与时间范围筛选 (API路由)
+
+    同时兼容 DataTables 的服务器端处理协议（请求中包含 draw 参数时）。
+    """
+    try:
+        ts_from = _parse_time(request.args.get('from'))
+        ts_to = _parse_time(request.args.get('to'), end_of_day=True)
+        rarities = _parse_rarities(request.args.get('rarity'))
+    except ValueError as e:
+        return jsonify({"error": f"Invalid parameter: {str(e)}"}), 400
+
+    account_data, error = get_account_data(current_user.username, game_uid)
+    if error:
+        return jsonify(error[0]), error[1]
+
+    lo, hi = account_data.range_bounds(ts_from, ts_to)
+    candidates = _candidate_positions(account_data, lo, hi, request.args.get('pool'), rarities)
+    predicate = _build_predicate(request.args.get('search[value]', '').strip())
+
+    if 'draw' in request.args:
+        return _datatables_response(account_data, candidates, predicate)
+
+    limit = request.args.get('limit', type=int, default=DEFAULT_PAGE_SIZE)
+    limit = min(max(limit or DEFAULT_PAGE_SIZE, 1), MAX_PAGE_SIZE)
+    descending = request.args.get('order', 'desc') != 'asc'
+
+    cursor = request.args.get('cursor')
+    if cursor:
+        start = account_data.decode_cursor(cursor)
+        if start is None:
+            return jsonify({"error": "Invalid cursor"}), 400
+    else:
+        start = hi - 1 if descending else lo
+
+    page, next_index = _collect_page(account_data, candidates, start, descending, predicate, limit)
+    return jsonify({
+        "items": [_serialize_pull(p) for p in page],
+        "next_cursor": account_data.encode_cursor(next_index) if next_index is not None else None,
+        "total": len(account_data)
+    })
@@ -0,0 +1,103 @@
+import functools
+import hashlib
+from datetime import datetime, timezone
+from pathlib import Path
+from flask import request, make_response
+from flask_login import current_user
+from app.compression import choose_encoding, encoded_etag, etag_variants
+from solvers import operator_catalog, pool_catalog
+from solvers.file_lock import file_mtime
+
+# 数据响应只在 data.json 变化时才会变化，浏览器每次使用前需向服务器确认
+DATA_CACHE_CONTROL = "private, no-cache"
+
+# 响应内容还依赖于目录（干员职业与阵营、卡池类型与分组）的视图，目录文件变化时 ETag 也随之变化
+OPERATOR_CATALOG_PATHS = (operator_catalog.DEFAULT_CATALOG_PATH, operator_catalog.DISCOVERED_OPERATORS_PATH)
+POOL_CATALOG_PATHS = (pool_catalog.DEFAULT_CATALOG_PATH, pool_catalog.DISCOVERED_POOLS_PATH)
+
+
+def get_data_file(username, game_uid):
+    """返回账号 data.json 的路径"""
+    return Path("users") / username / 'accounts' / game_uid / 'data.json'
+
+
+def get_data_version(username, game_uid):
+    """根据 data.json 的修改时间与大小生成数据版本号，只 stat 不读取文件
+
+    Returns:
+        (version, mtime) 元组；文件不存在时返回 (None, None)
+    """
+    try:
+        st = get_data_file(username, game_uid).stat()
+    except OSError:
+        return None, None
+    return f"{st.st_mtime_ns:x}-{st.st_size:x}", st.st_mtime
+
+
+def make_data_etag(username, game_uid, version, variant=''):
+    """由用户、账号、数据版本与请求变体（路径和查询参数）生成强 ETag 值（不含引号）"""
+    raw = f"{username}/{game_uid}/{version}/{variant}".encode('utf-8')
+    return hashlib.sha1(raw).hexdigest()[:20]
+
+
+def _match_conditional(etag, last_modified):
+    """判断请求携带的条件头是否与当前数据版本一致
+
+    Returns:
+        命中时返回应回传给客户端的 ETag（可能带有压缩编码后缀），否则返回 None
+    """
+    if request.if_none_match:
+        for candidate in etag_variants(etag):
+            if request.if_none_match.contains(candidate):
+                return candidate
+        return None
+    if request.if_modified_since and last_modified is not None:
+        if request.if_modified_since >= last_modified:
+            return encoded_etag(etag, choose_encoding())
+    return None
+
+
+def conditional_data_response(f=None, *, catalog_paths=()):
+    """为依赖 data.json 的视图增加 ETag / Last-Modified 条件响应
+
+    命中 If-None-Match / If-Modified-Since 时直接返回 304，不再执行视图函数，
+    因此不会发生任何文件解析或统计计算。视图参数需包含 game_uid 或 account_uid，
+    用户名取自 username 参数，缺省时使用当前登录用户。
+    响应还依赖目录文件时通过 catalog_paths 传入，其修改时间计入 ETag 与 Last-Modified：
+    @conditional_data_response(catalog_paths=POOL_CATALOG_PATHS)
+    """
+    if f is None:
+        return functools.partial(conditional_data_response, catalog_paths=catalog_paths)
+
+    @functools.wraps(f)
+    def decorated_function(*args, **kwargs):
+        username = kwargs.get('username') or current_user.username
+        game_uid = kwargs.get('game_uid') or kwargs.get('account_uid')
+        version, mtime = get_data_version(username, game_uid)
+        if version is None:
+            return f(*args, **kwargs)
+
+        variant = request.full_path
+        if catalog_paths:
+            catalog_mtimes = [file_mtime(path) for path in catalog_paths]
+            variant += "".join(f"/{m or 0:x}" for m in catalog_mtimes)
+            mtime = max([mtime] + [m / 1e9 for m in catalog_mtimes if m is not None])
+        etag = make_data_etag(username, game_uid, version, variant)
+        # HTTP 日期精度为秒
+        last_modified = datetime.fromtimestamp(int(mtime), tz=timezone.utc)
+
+        matched_etag = _match_conditional(etag, last_modified)
+        if matched_etag:
+            response = make_response('', 304)
+            response.set_etag(matched_etag)
+        else:
+            response = make_response(f(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+            # 预压缩响应在这里已带有 Content-Encoding，其余响应由压缩钩子追加后缀
+            response.set_etag(encoded_etag(etag, response.headers.get('Content-Encoding')))
+
+        response.last_modified = last_modified
+        response.headers['Cache-Control'] = DATA_CACHE_CONTROL
+        return response
+    return decorated_function
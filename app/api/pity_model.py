@@ -0,0 +1,204 @@
+import math
+from functools import lru_cache
+import numpy as np
+
+# 六星概率规则：基础 2%，第 50 抽之后每抽 +2%，第 99 抽必出
+BASE_SIX_STAR_RATE = 0.02
+SOFT_PITY_START = 50
+SOFT_PITY_STEP = 0.02
+HARD_PITY = 99
+
+# 概率表覆盖的最大计划抽数与六星个数
+MAX_PLAN_PULLS = 600
+MAX_TARGET_COUNT = 6
+
+
+def six_star_rate(pull_number):
+    """距上次六星第 pull_number 抽出六星的概率"""
+    if pull_number <= SOFT_PITY_START:
+        return BASE_SIX_STAR_RATE
+    return min(BASE_SIX_STAR_RATE + (pull_number - SOFT_PITY_START) * SOFT_PITY_STEP, 1.0)
+
+
+def _build_gap_tables():
+    """从零水位开始，六星恰好在第 k 抽出现的概率 pmf[k] 与尚未出现的概率 survival[k]"""
+    pmf = [0.0] * (HARD_PITY + 1)
+    survival = [1.0] * (HARD_PITY + 1)
+    for k in range(1, HARD_PITY + 1):
+        pmf[k] = survival[k - 1] * six_star_rate(k)
+        survival[k] = survival[k - 1] - pmf[k]
+    survival[HARD_PITY] = 0.0
+    return tuple(pmf), tuple(survival)
+
+
+GAP_PMF, GAP_SURVIVAL = _build_gap_tables()
+
+
+def _clamp_pity(current_pity):
+    return min(max(int(current_pity), 0), HARD_PITY - 1)
+
+
+@lru_cache(maxsize=None)
+def first_six_star_distribution(current_pity):
+    """当前水位下，再抽 n 次恰好出第一个六星的概率，返回元组 (下标 n 从 1 开始，[0] 为 0)"""
+    pity = _clamp_pity(current_pity)
+    remaining = GAP_SURVIVAL[pity]
+    return (0.0,) + tuple(GAP_PMF[k] / remaining for k in range(pity + 1, HARD_PITY + 1))
+
+
+@lru_cache(maxsize=None)
+def expected_pulls_to_six_star(current_pity):
+    """当前水位下，期望还需多少抽出六星"""
+    dist = first_six_star_distribution(current_pity)
+    return sum(n * p for n, p in enumerate(dist))
+
+
+@lru_cache(maxsize=HARD_PITY)
+def _at_least_table(current_pity):
+    """table[k-1][n]：当前水位下 n 抽内至少出 k 个六星的概率 (n <= MAX_PLAN_PULLS)
+
+    第 k 个六星所需抽数的分布 = 首个六星的分布与 (k-1) 次零水位间隔分布的卷积，
+    每个水位只计算一次。
+    """
+    first = first_six_star_distribution(current_pity)
+    pmf = [0.0] * (MAX_PLAN_PULLS + 1)
+    pmf[:len(first)] = first[:MAX_PLAN_PULLS + 1]
+
+    table = []
+    for k in range(1, MAX_TARGET_COUNT + 1):
+        if k > 1:
+            # 与零水位的间隔分布做卷积，截断到 MAX_PLAN_PULLS
+            convolved = [0.0] * (MAX_PLAN_PULLS + 1)
+            for n, p in enumerate(pmf):
+                if p == 0.0:
+                    continue
+                for gap in range(1, min(HARD_PITY, MAX_PLAN_PULLS - n) + 1):
+                    convolved[n + gap] += p * GAP_PMF[gap]
+            pmf = convolved
+        cdf = []
+        running = 0.0
+        for p in pmf:
+            running += p
+            cdf.append(min(running, 1.0))
+        table.append(tuple(cdf))
+    return tuple(table)
+
+
+def prob_at_least(count, pulls, current_pity=0):
+    """当前水位下，pulls 抽内至少出 count 个六星的概率（查表）"""
+    if count <= 0:
+        return 1.0
+    if pulls <= 0:
+        return 0.0
+    if count > MAX_TARGET_COUNT or pulls > MAX_PLAN_PULLS:
+        raise ValueError(f"Supported range is count <= {MAX_TARGET_COUNT}, pulls <= {MAX_PLAN_PULLS}")
+    return _at_least_table(_clamp_pity(current_pity))[count - 1][pulls]
+
+
+def pity_outlook(current_pity, horizons=(10, 30, 50, 100)):
+    """仪表盘使用的水位展望：期望剩余抽数，以及若干抽数内出六星的概率"""
+    return {
+        "expected_pulls": round(expected_pulls_to_six_star(_clamp_pity(current_pity)), 2),
+        "six_star_within": {str(n): round(prob_at_least(1, n, current_pity), 4) for n in horizons}
+    }
+
+
+# --- 运气评估 ---
+
+# 官方公布的基础出率
+OFFICIAL_RARITY_RATES = {6: 0.02, 5: 0.08, 4: 0.50, 3: 0.40}
+
+# 不超过该数量的六星间隔使用精确分布计算均值百分位，超过时使用正态近似
+MAX_EXACT_INTERVALS = 64
+
+GAP_CDF = tuple(1.0 - s for s in GAP_SURVIVAL)
+GAP_MEAN = sum(k * p for k, p in enumerate(GAP_PMF))
+GAP_VARIANCE = sum(k * k * p for k, p in enumerate(GAP_PMF)) - GAP_MEAN ** 2
+
+
+@lru_cache(maxsize=1)
+def _interval_sum_cdfs():
+    """cdfs[n][s]：n 个零水位六星间隔之和不超过 s 的概率 (1 <= n <= MAX_EXACT_INTERVALS)"""
+    gap_pmf = np.asarray(GAP_PMF)
+    cdfs = [None]
+    pmf = np.array([1.0])
+    for _ in range(MAX_EXACT_INTERVALS):
+        pmf = np.convolve(pmf, gap_pmf)
+        cdfs.append(np.minimum(np.cumsum(pmf), 1.0))
+    return cdfs
+
+
+def mean_pity_percentile(intervals):
+    """观测到的平均出货抽数在理论分布中的百分位（越小越欧）
+
+    取中点秩：P(均值 < 观测) + P(均值 = 观测) / 2。
+    与 ks_test 相同，超出 [1, HARD_PITY] 的间隔（如导入数据中的异常值）先截断到支撑集内。
+    """
+    n = len(intervals)
+    if n == 0:
+        return None
+    total = sum(min(max(gap, 1), HARD_PITY) for gap in intervals)
+    if n <= MAX_EXACT_INTERVALS:
+        cdf = _interval_sum_cdfs()[n]
+        last = len(cdf) - 1
+        at_most = float(cdf[min(total, last)])
+        below = float(cdf[min(total - 1, last)]) if total >= 1 else 0.0
+        return (below + at_most) / 2
+    # 间隔较多时使用中心极限定理的正态近似
+    z = (total - n * GAP_MEAN) / math.sqrt(n * GAP_VARIANCE)
+    return 0.5 * math.erfc(-z / math.sqrt(2))
+
+
+def _kolmogorov_p_value(statistic, n):
+    """Kolmogorov 分布的渐近 p 值 (Stephens 修正)；对离散分布偏保守"""
+    root_n = math.sqrt(n)
+    lam = (root_n + 0.12 + 0.11 / root_n) * statistic
+    if lam < 1e-3:
+        return 1.0
+    total = 0.0
+    for j in range(1, 101):
+        term = 2 * (-1) ** (j - 1) * math.exp(-2 * j * j * lam * lam)
+        total += term
+        if abs(term) < 1e-10:
+            break
+    return min(max(total, 0.0), 1.0)
+
+
+def ks_test(intervals):
+    """六星间隔与理论分布的 Kolmogorov-Smirnov 检验，返回 (D 统计量, p 值)"""
+    n = len(intervals)
+    if n == 0:
+        return None, None
+    counts = [0] * (HARD_PITY + 1)
+    for gap in intervals:
+        counts[min(max(gap, 1), HARD_PITY)] += 1
+    statistic = 0.0
+    seen = 0
+    for k in range(1, HARD_PITY + 1):
+        seen += counts[k]
+        statistic = max(statistic, abs(seen / n - GAP_CDF[k]))
+    return statistic, _kolmogorov_p_value(statistic, n)
+
+
+def expected_rarity_rates():
+    """计入保底后的长期出率：六星为 1 / 平均间隔，其余稀有度按基础比例分摊剩余概率"""
+    six = 1.0 / GAP_MEAN
+    others = 1.0 - OFFICIAL_RARITY_RATES[6]
+    rates = {6: six}
+    for rarity in (5, 4, 3):
+        rates[rarity] = OFFICIAL_RARITY_RATES[rarity] / others * (1.0 - six)
+    return rates
+
+
+def chi_square_rarity_test(rarity_counts):
+    """稀有度计数与长期出率的卡方拟合检验 (自由度 3)，返回 (统计量, p 值)"""
+    total = sum(rarity_counts.get(r, 0) for r in OFFICIAL_RARITY_RATES)
+    if total == 0:
+        return None, None
+    statistic = 0.0
+    for rarity, rate in expected_rarity_rates().items():
+        expected = total * rate
+        statistic += (rarity_counts.get(rarity, 0) - expected) ** 2 / expected
+    # 自由度为 3 的卡方分布生存函数的闭式解
+    p_value = math.erfc(math.sqrt(statistic / 2)) + math.sqrt(2 * statistic / math.pi) * math.exp(-statistic / 2)
+    return statistic, min(p_value, 1.0)
@@ -0,0 +1,66 @@
+from bisect import bisect_right
+from solvers.pool_catalog import get_pool_catalog, LIMITED, STANDARD, JOINT_OP
+
+
+class PityTracker:
+    """按卡池家族维护六星保底水位的状态机，只需对抽卡记录做一次顺序遍历
+
+    保底家族取自卡池目录 (PoolInfo.family，按 Pull.pool_id 查找)：标准寻访之间、
+    中坚寻访之间各自共享保底，每个限定寻访单独计算保底。
+    新数据追加到已处理记录之后时，可以复制旧状态继续处理新增部分。
+    """
+
+    def __init__(self):
+        self.counters = {}
+        self.intervals = {LIMITED: [], STANDARD: [], JOINT_OP: []}
+        self.totals = {LIMITED: 0, STANDARD: 0, JOINT_OP: 0}
+        # 每种卡池类型最近一次抽取的卡池 (PoolInfo)（限定池的当前水位取自最近抽取的限定池）
+        self.latest_pool = {}
+        self.consumed = 0
+        self.last_ts = None
+
+    def feed(self, pulls, start=0):
+        """依次处理 pulls[start:]，pulls 须按时间升序排列"""
+        counters = self.counters
+        catalog = get_pool_catalog()
+        for position in range(start, len(pulls)):
+            pull = pulls[position]
+            pool = catalog.get(pull.pool_id) or catalog.resolve(pull.pool_name, pool_type=pull.pool_type)
+            family = pool.family
+            pity = counters.get(family, 0) + 1
+            if pull.rarity == 6:
+                self.intervals.setdefault(pull.pool_type, []).append(pity)
+                pity = 0
+            counters[family] = pity
+            self.totals[pull.pool_type] = self.totals.get(pull.pool_type, 0) + 1
+            self.latest_pool[pull.pool_type] = pool
+        if len(pulls) > start:
+            self.consumed = len(pulls)
+            self.last_ts = pulls[-1].ts
+        return self
+
+    def copy(self):
+        tracker = PityTracker()
+        tracker.counters = dict(self.counters)
+        tracker.intervals = {k: list(v) for k, v in self.intervals.items()}
+        tracker.totals = dict(self.totals)
+        tracker.latest_pool = dict(self.latest_pool)
+        tracker.consumed = self.consumed
+        tracker.last_ts = self.last_ts
+        return tracker
+
+    def can_resume(self, ts_list):
+        """新数据的前 consumed 条记录是否与已处理部分一致（只在末尾追加了记录）"""
+        if self.last_ts is None:
+            return False
+        return len(ts_list) >= self.consumed and bisect_right(ts_list, self.last_ts) == self.consumed
+
+    def current_pity(self, pool_type):
+        """指定卡池类型的当前水位：取该类型最近抽取的卡池家族的水位"""
+        pool = self.latest_pool.get(pool_type)
+        return self.counters.get(pool.family, 0) if pool is not None else 0
+
+    def current_banner(self, pool_type):
+        """限定池当前水位所对应的卡池名，其他类型为 None"""
+        pool = self.latest_pool.get(pool_type)
+        return pool.name if pool is not None and pool_type == LIMITED else None
@@ -0,0 +1,62 @@
+import sys
+from solvers.pool_catalog import get_pool_catalog, SOURCE_RULE
+from solvers.record_merge import record_key
+
+
+class Pull:
+    """单次寻访记录的紧凑表示
+
+    使用 __slots__ 代替每条记录一个 dict；卡池名与干员名经过驻留 (intern)，
+    同名字符串在整个进程内只保存一份。pool_id 为卡池目录中的整数 ID。
+    """
+    __slots__ = ('ts', 'pool_name', 'pool_type', 'char_name', 'rarity', 'is_new', 'pool_id')
+
+    def __init__(self, ts, pool_name, pool_type, char_name, rarity, is_new, pool_id=0):
+        self.ts = ts
+        self.pool_name = pool_name
+        self.pool_type = pool_type
+        self.char_name = char_name
+        self.rarity = rarity
+        self.is_new = is_new
+        self.pool_id = pool_id
+
+    def to_dict(self):
+        return {
+            "ts": self.ts,
+            "pool_name": self.pool_name,
+            "pool_type": self.pool_type,
+            "char_name": self.char_name,
+            "rarity": self.rarity,
+            "is_new": self.is_new,
+            "pool_id": self.pool_id
+        }
+
+    def __repr__(self):
+        return f"Pull({self.ts}, {self.pool_name!r}, {self.char_name!r}, {self.rarity})"
+
+
+def pulls_from_gacha_data(gacha_data, catalog=None):
+    """将 data.json 的内容展开为按时间升序排列的 Pull 列表
+
+    记录键为毫秒级的 gachaTs（兼容旧的秒级键），按键排序后展开，
+    同一秒内的多条记录也能保持真实的先后顺序；Pull.ts 为秒级时间戳。
+    catalog 默认为全局卡池目录（基准测试等可传入独立的目录，避免写入 users/.pool_catalog.json）。
+    """
+    intern = sys.intern
+    catalog = catalog or get_pool_catalog()
+    all_pulls = []
+    # 文件按时间倒序存储，Timsort 对整体逆序的输入只需线性时间
+    for ts, record in sorted(gacha_data.items(), key=lambda item: record_key(item[0])):
+        # 同一条记录（十连）中的抽卡共享时间戳与卡池名对象，c 中的顺序即抽卡位置 (pos)
+        ts_value = record_key(ts) // 1000
+        # 卡池名与 ID 通过目录解析；目录中的类型来自官方接口分类（或随代码发布的目录）时以目录为准，
+        # 否则以已保存的 pt 为准（同时用于登记目录中没有的卡池）
+        pool_info = catalog.resolve(record['p'], pool_type=record['pt'])
+        pool_type = record['pt'] if pool_info.source == SOURCE_RULE else pool_info.pool_type
+        pool_name = pool_info.name
+        for char_name, rarity, is_new in record['c']:
+            all_pulls.append(Pull(ts_value, pool_name, pool_type, intern(char_name), rarity, is_new, pool_info.id))
+    # 加载中新登记的卡池一次写入
+    catalog.save()
+
+    return all_pulls
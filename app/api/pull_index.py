@@ -0,0 +1,96 @@
+from array import array
+from bisect import bisect_left
+
+
+class PullIndex:
+    """抽卡记录的二级索引，每个数据版本只构建一次
+
+    - 卡池名 / 卡池类型 / 干员名 -> 对应抽卡在 pulls 中的下标（升序）
+    - 稀有度 -> 下标列表，以及前缀计数（任意区间的稀有度计数为 O(1)）
+    时间范围由 AccountData.ts_list 通过 bisect 定位到下标区间 [lo, hi)，
+    再在各下标数组上二分，即可得到区间内某个卡池 / 类型 / 稀有度的记录。
+    """
+
+    RARITIES = (6, 5, 4, 3)
+
+    def __init__(self, pulls):
+        self.size = len(pulls)
+        self.by_pool = {}
+        self.by_pool_type = {}
+        self.by_char = {}
+        self.by_rarity = {r: array('i') for r in self.RARITIES}
+        self.rarity_prefix = {r: array('i', [0]) for r in self.RARITIES}
+        self._pool_six_stars = {}
+
+        counts = dict.fromkeys(self.RARITIES, 0)
+        for position, pull in enumerate(pulls):
+            pool_positions = self.by_pool.get(pull.pool_name)
+            if pool_positions is None:
+                pool_positions = self.by_pool[pull.pool_name] = array('i')
+            pool_positions.append(position)
+
+            type_positions = self.by_pool_type.get(pull.pool_type)
+            if type_positions is None:
+                type_positions = self.by_pool_type[pull.pool_type] = array('i')
+            type_positions.append(position)
+
+            char_positions = self.by_char.get(pull.char_name)
+            if char_positions is None:
+                char_positions = self.by_char[pull.char_name] = array('i')
+            char_positions.append(position)
+
+            if pull.rarity in counts:
+                counts[pull.rarity] += 1
+                self.by_rarity[pull.rarity].append(position)
+            for rarity in self.RARITIES:
+                self.rarity_prefix[rarity].append(counts[rarity])
+
+    @staticmethod
+    def slice_positions(positions, lo, hi):
+        """返回下标数组中落在 [lo, hi) 内的部分，O(log n)"""
+        return positions[bisect_left(positions, lo):bisect_left(positions, hi)]
+
+    @staticmethod
+    def count_positions(positions, lo, hi):
+        """统计下标数组中落在 [lo, hi) 内的数量，O(log n)"""
+        return bisect_left(positions, hi) - bisect_left(positions, lo)
+
+    def pool_positions(self, pool_name):
+        return self.by_pool.get(pool_name, array('i'))
+
+    def pool_type_positions(self, pool_type):
+        return self.by_pool_type.get(pool_type, array('i'))
+
+    def char_positions(self, char_name):
+        return self.by_char.get(char_name, array('i'))
+
+    def rarity_positions(self, rarity):
+        return self.by_rarity.get(rarity, array('i'))
+
+    def rarity_count(self, rarity, lo=0, hi=None):
+        """区间 [lo, hi) 内指定稀有度的抽数，O(1)"""
+        prefix = self.rarity_prefix[rarity]
+        hi = self.size if hi is None else hi
+        return prefix[hi] - prefix[lo]
+
+    def pools_in_order(self):
+        """按首次抽取时间排列的卡池名列表"""
+        return sorted(self.by_pool, key=lambda name: self.by_pool[name][0])
+
+    def pool_six_stars(self, pulls, pool_name):
+        """指定卡池内（按卡池单独计算水位）的六星记录列表，结果按卡池缓存
+
+        Returns:
+            [(下标, 出货抽数), ...]
+        """
+        cached = self._pool_six_stars.get(pool_name)
+        if cached is None:
+            cached = []
+            pity_counter = 0
+            for position in self.pool_positions(pool_name):
+                pity_counter += 1
+                if pulls[position].rarity == 6:
+                    cached.append((position, pity_counter))
+                    pity_counter = 0
+            self._pool_six_stars[pool_name] = cached
+        return cached
@@ -0,0 +1,211 @@
+import heapq
+from datetime import datetime
+from flask import Blueprint, jsonify, request
+from flask_login import login_required, current_user
+from app.api.account_cache import get_account_data
+from app.api.http_cache import conditional_data_response
+from app.api.history import _parse_time
+
+query_bp = Blueprint('query_bp', __name__)
+
+GROUP_BY_OPTIONS = ("month", "day", "pool", "pool_type", "operator", "rarity")
+AGGREGATE_OPTIONS = ("count", "rarity_counts")
+
+
+class PullQuery:
+    """抽卡记录查询条件
+
+    所有条件之间为“与”关系，同一条件内的多个取值为“或”关系。
+    """
+
+    def __init__(self, rarities=None, pool_names=None, pool_types=None, operators=None,
+                 is_new=None, ts_from=None, ts_to=None):
+        self.rarities = set(rarities) if rarities else None
+        self.pool_names = set(pool_names) if pool_names else None
+        self.pool_types = set(pool_types) if pool_types else None
+        self.operators = set(operators) if operators else None
+        self.is_new = is_new
+        self.ts_from = ts_from
+        self.ts_to = ts_to
+
+    def matches(self, pull):
+        """逐条检查（只用于索引未覆盖的条件）"""
+        if self.rarities is not None and pull.rarity not in self.rarities:
+            return False
+        if self.pool_names is not None and pull.pool_name not in self.pool_names:
+            return False
+        if self.pool_types is not None and pull.pool_type not in self.pool_types:
+            return False
+        if self.operators is not None and pull.char_name not in self.operators:
+            return False
+        if self.is_new is not None and bool(pull.is_new) != self.is_new:
+            return False
+        return True
+
+
+def _union_positions(pull_index, lookup, keys, lo, hi):
+    """合并多个下标数组在 [lo, hi) 内的部分，返回升序下标列表"""
+    slices = [pull_index.slice_positions(lookup(key), lo, hi) for key in keys]
+    if len(slices) == 1:
+        return slices[0]
+    return list(heapq.merge(*slices))
+
+
+def _plan_candidates(account_data, query):
+    """选择最具选择性的索引生成候选下标，返回 (候选下标序列, 已由索引满足的条件名)
+
+    时间范围总是通过 bisect 转换为下标区间；卡池名、卡池类型、干员与稀有度中
+    区间内命中数最少的一个条件直接由对应索引提供候选，其余条件再逐条检查。
+    """
+    pull_index = account_data.index
+    lo, hi = account_data.range_bounds(query.ts_from, query.ts_to)
+
+    options = []
+    if query.pool_names is not None:
+        options.append(("pool_names", pull_index.pool_positions, query.pool_names))
+    if query.pool_types is not None:
+        options.append(("pool_types", pull_index.pool_type_positions, query.pool_types))
+    if query.operators is not None:
+        options.append(("operators", pull_index.char_positions, query.operators))
+    if query.rarities is not None:
+        options.append(("rarities", pull_index.rarity_positions, query.rarities))
+
+    if not options:
+        return range(lo, hi), set()
+
+    def estimate(option):
+        _, lookup, keys = option
+        return sum(pull_index.count_positions(lookup(key), lo, hi) for key in keys)
+
+    name, lookup, keys = min(options, key=estimate)
+    return _union_positions(pull_index, lookup, keys, lo, hi), {name}
+
+
+def execute_query(account_data, query):
+    """执行查询，返回满足条件的 Pull 迭代器（按时间升序）"""
+    candidates, satisfied = _plan_candidates(account_data, query)
+    pulls = account_data.pulls
+
+    # 已由索引满足的条件不再逐条检查
+    residual = PullQuery(
+        rarities=None if "rarities" in satisfied else query.rarities,
+        pool_names=None if "pool_names" in satisfied else query.pool_names,
+        pool_types=None if "pool_types" in satisfied else query.pool_types,
+        operators=None if "operators" in satisfied else query.operators,
+        is_new=query.is_new,
+    )
+    needs_check = any(value is not None for value in (
+        residual.rarities, residual.pool_names, residual.pool_types, residual.operators, residual.is_new))
+
+    if not needs_check:
+        return (pulls[i] for i in candidates)
+    return (pulls[i] for i in candidates if residual.matches(pulls[i]))
+
+
+def _group_key_function(group_by):
+    """返回从 Pull 计算分组键的函数；按时间分组时按时间戳缓存，十连只计算一次"""
+    if group_by in ("month", "day"):
+        fmt = '%Y-%m' if group_by == "month" else '%Y-%m-%d'
+        cache = {}
+
+        def time_key(pull):
+            key = cache.get(pull.ts)
+            if key is None:
+                key = cache[pull.ts] = datetime.fromtimestamp(pull.ts).strftime(fmt)
+            return key
+        return time_key
+    if group_by == "pool":
+        return lambda pull: pull.pool_name
+    if group_by == "pool_type":
+        return lambda pull: pull.pool_type
+    if group_by == "operator":
+        return lambda pull: pull.char_name
+    return lambda pull: pull.rarity
+
+
+def aggregate_pulls(pulls, group_by=None, aggregate="count"):
+    """对查询结果分组聚合 (核心逻辑)"""
+    with_rarity = aggregate == "rarity_counts"
+    groups = {}
+    total = 0
+    key_of = _group_key_function(group_by) if group_by else (lambda pull: None)
+
+    for pull in pulls:
+        total += 1
+        key = key_of(pull)
+        group = groups.get(key)
+        if group is None:
+            group = groups[key] = {"key": key, "count": 0}
+            if with_rarity:
+                group["rarity_counts"] = {"6": 0, "5": 0, "4": 0, "3": 0}
+        group["count"] += 1
+        if with_rarity and str(pull.rarity) in group["rarity_counts"]:
+            group["rarity_counts"][str(pull.rarity)] += 1
+
+    if not group_by:
+        result = {"total": total}
+        if with_rarity:
+            result["rarity_counts"] = groups[None]["rarity_counts"] if groups else {"6": 0, "5": 0, "4": 0, "3": 0}
+        return result
+
+    group_list = list(groups.values())
+    if group_by in ("month", "day", "pool_type"):
+        group_list.sort(key=lambda g: g["key"])
+    elif group_by == "rarity":
+        group_list.sort(key=lambda g: g["key"], reverse=True)
+    elif group_by == "operator":
+        group_list.sort(key=lambda g: g["count"], reverse=True)
+    # 按卡池分组时保持首次出现的时间顺序
+    return {"total": total, "group_by": group_by, "groups": group_list}
+
+
+def _parse_int_list(values):
+    """解析可重复且可用逗号分隔的整数参数"""
+    result = []
+    for value in values:
+        result.extend(int(v) for v in value.split(',') if v.strip())
+    return result or None
+
+
+def _parse_query_args(args):
+    """从请求参数构造 PullQuery"""
+    is_new = args.get('is_new')
+    if is_new is not None and is_new not in ('0', '1', 'true', 'false'):
+        raise ValueError(f"is_new must be 0/1, got {is_new!r}")
+    return PullQuery(
+        rarities=_parse_int_list(args.getlist('rarity')),
+        pool_names=args.getlist('pool') or None,
+        pool_types=_parse_int_list(args.getlist('pool_type')),
+        operators=args.getlist('operator') or None,
+        is_new=None if is_new is None else is_new in ('1', 'true'),
+        ts_from=_parse_time(args.get('from')),
+        ts_to=_parse_time(args.get('to'), end_of_day=True),
+    )
+
+
+@query_bp.route('/api/query/<string:game_uid>')
+@login_required
+@conditional_data_response
+def query_pulls(game_uid):
+    """按条件筛选抽卡记录并分组统计 (API路由)
+
+    筛选参数：rarity, pool, pool_type, operator（均可重复）, is_new, from, to
+    聚合参数：group_by (month/day/pool/pool_type/operator/rarity), agg (count/rarity_counts)
+    """
+    group_by = request.args.get('group_by') or None
+    aggregate = request.args.get('agg', 'count')
+    if group_by is not None and group_by not in GROUP_BY_OPTIONS:
+        return jsonify({"error": f"Unsupported group_by: {group_by}"}), 400
+    if aggregate not in AGGREGATE_OPTIONS:
+        return jsonify({"error": f"Unsupported agg: {aggregate}"}), 400
+    try:
+        query = _parse_query_args(request.args)
+    except ValueError as e:
+        return jsonify({"error": f"Invalid parameter: {str(e)}"}), 400
+
+    account_data, error = get_account_data(current_user.username, game_uid)
+    if error:
+        return jsonify(error[0]), error[1]
+
+    result = aggregate_pulls(execute_query(account_data, query), group_by, aggregate)
+    return jsonify(result)
@@ -0,0 +1,233 @@
+import time
+from functools import lru_cache
+import numpy as np
+from flask import Blueprint, jsonify, request
+from flask_login import login_required, current_user
+from app.api.account_cache import get_account_data
+from app.api.pity_model import HARD_PITY, first_six_star_distribution
+
+simulate_bp = Blueprint('simulate_bp', __name__)
+
+POOL_TYPES = {"limited": 0, "standard": 1, "joint_op": 2}
+# 各类卡池默认的兑换所需抽数：只有限定寻访有 300 抽兑换
+DEFAULT_SPARK = {"limited": 300, "standard": 0, "joint_op": 0}
+
+DEFAULT_TRIALS = 100_000
+MAX_TRIALS = 1_000_000
+MAX_PULLS = 3000
+DEFAULT_TIME_BUDGET_MS = 500
+MAX_TIME_BUDGET_MS = 2000
+# 每批模拟的试验数，批与批之间检查时间预算
+TRIAL_CHUNK = 131_072
+
+
+class BannerRules:
+    """卡池规则
+
+    - rate_up: 出六星时为目标干员的概率（限定池双 UP 各 35%）
+    - fifty_fifty: 开启后，六星未命中目标时下一个六星必为目标
+    - spark: 卡池内累计该抽数时可直接兑换目标干员，0 表示没有
+    - spark_progress: 本卡池已计入兑换进度的抽数
+    """
+
+    def __init__(self, rate_up=0.35, fifty_fifty=False, spark=300, spark_progress=0):
+        if not 0.0 <= rate_up <= 1.0:
+            raise ValueError("rate_up must be within [0, 1]")
+        if spark < 0 or spark_progress < 0:
+            raise ValueError("spark and spark_progress must be non-negative")
+        self.rate_up = rate_up
+        self.fifty_fifty = fifty_fifty
+        self.spark = spark
+        self.spark_progress = spark_progress
+
+
+@lru_cache(maxsize=HARD_PITY)
+def _gap_alias_table(current_pity):
+    """六星间隔分布的别名表 (Walker/Vose)，每次采样为 O(1) 且结果精确
+
+    Returns:
+        (接受概率数组, 别名数组)，下标 i 对应间隔 i + 1 抽
+    """
+    dist = first_six_star_distribution(current_pity)[1:]
+    n = len(dist)
+    scaled = [p * n for p in dist]
+    accept = [1.0] * n
+    alias = list(range(n))
+    small = [i for i, p in enumerate(scaled) if p < 1.0]
+    large = [i for i, p in enumerate(scaled) if p >= 1.0]
+    while small and large:
+        s, l = small.pop(), large.pop()
+        accept[s], alias[s] = scaled[s], l
+        scaled[l] -= 1.0 - scaled[s]
+        (small if scaled[l] < 1.0 else large).append(l)
+    return np.asarray(accept), np.asarray(alias, dtype=np.int32)
+
+
+def _sample_gaps(rng, size, table):
+    """按别名表批量采样六星间隔（抽数）"""
+    accept, alias = table
+    index = rng.integers(0, len(accept), size=size, dtype=np.int32)
+    return np.where(rng.random(size) < accept[index], index, alias[index]) + 1
+
+
+def _simulate_chunk(rng, trials, pulls, rules, first_table, base_table):
+    """模拟一批试验，返回 (六星数, 目标干员数, 首次获得目标的抽数) 三个数组
+
+    按“六星间隔”逐轮推进：每轮为所有仍在预算内的试验同时采样下一个六星间隔，
+    轮数只与预算内最多的六星个数有关，与抽数无关。
+    """
+    six_counts = np.zeros(trials, dtype=np.int32)
+    copies = np.zeros(trials, dtype=np.int32)
+    first_target = np.full(trials, pulls + 1, dtype=np.int32)
+
+    # 仍在预算内的试验及其状态，每轮压缩一次
+    active = np.arange(trials, dtype=np.int32)
+    used = np.zeros(trials, dtype=np.int32)
+    guaranteed = np.zeros(trials, dtype=bool)
+    table = first_table
+    rounds = 0
+    while active.size:
+        position = used + _sample_gaps(rng, active.size, table)
+        hit = position <= pulls
+        # 超出预算的试验已经完成，其六星数即为已进行的轮数
+        six_counts[active[~hit]] = rounds
+        active, position, guaranteed = active[hit], position[hit], guaranteed[hit]
+        rounds += 1
+
+        is_target = rng.random(active.size) < rules.rate_up
+        if rules.fifty_fifty:
+            is_target |= guaranteed
+            guaranteed = ~is_target
+        target_trials = active[is_target]
+        copies[target_trials] += 1
+        first_target[target_trials] = np.minimum(first_target[target_trials], position[is_target])
+
+        used = position
+        table = base_table
+
+    # 兑换：预算内达到兑换所需抽数时额外获得一个目标干员
+    if rules.spark and pulls >= rules.spark - rules.spark_progress:
+        spark_at = max(rules.spark - rules.spark_progress, 0)
+        copies += 1
+        np.minimum(first_target, spark_at, out=first_target)
+
+    return six_counts, copies, first_target
+
+
+def run_simulation(pulls, current_pity=0, rules=None, trials=DEFAULT_TRIALS,
+                   seed=None, time_budget_ms=DEFAULT_TIME_BUDGET_MS):
+    """蒙特卡洛模拟抽卡计划 (核心逻辑)
+
+    超出时间预算时提前结束，返回已完成的试验数并标记 truncated；time_budget_ms 为 None 时
+    总是完成全部试验，相同的 seed 与参数得到相同的结果。
+    """
+    rules = rules or BannerRules()
+    current_pity = min(max(int(current_pity), 0), HARD_PITY - 1)
+    rng = np.random.default_rng(seed)
+    first_table = _gap_alias_table(current_pity)
+    base_table = _gap_alias_table(0)
+
+    started = time.perf_counter()
+    deadline = started + time_budget_ms / 1000 if time_budget_ms is not None else None
+    six_parts, copy_parts, first_parts = [], [], []
+    done = 0
+    while done < trials:
+        chunk = min(TRIAL_CHUNK, trials - done)
+        six_counts, copies, first_target = _simulate_chunk(
+            rng, chunk, pulls, rules, first_table, base_table)
+        six_parts.append(six_counts)
+        copy_parts.append(copies)
+        first_parts.append(first_target)
+        done += chunk
+        if deadline is not None and time.perf_counter() > deadline:
+            break
+
+    six_counts = np.concatenate(six_parts)
+    copies = np.concatenate(copy_parts)
+    first_target = np.concatenate(first_parts)
+    obtained = first_target <= pulls
+
+    def histogram(values):
+        counts = np.bincount(values)
+        return [{"count": int(k), "prob": float(c) / done} for k, c in enumerate(counts) if c]
+
+    pulls_to_target = None
+    if obtained.any():
+        p50, p90 = np.percentile(first_target[obtained], [50, 90])
+        pulls_to_target = {"p50": float(p50), "p90": float(p90)}
+
+    return {
+        "trials": done,
+        "truncated": done < trials,
+        "seed": seed,
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+        "pulls": pulls,
+        "current_pity": current_pity,
+        "target_prob": float(obtained.mean()),
+        "expected_six_stars": float(six_counts.mean()),
+        "expected_copies": float(copies.mean()),
+        "pulls_to_target": pulls_to_target,
+        "six_star_histogram": histogram(six_counts),
+        "copies_histogram": histogram(copies)
+    }
+
+
+def _parse_simulation_args(args, pool_type):
+    """解析模拟参数，非法时抛出 ValueError
+
+    指定了 seed 时不使用时间预算（time_budget_ms 为 None），保证结果可以复现。
+    """
+    pulls = int(args.get('pulls', ''))
+    if not 1 <= pulls <= MAX_PULLS:
+        raise ValueError(f"pulls must be within [1, {MAX_PULLS}]")
+    trials = int(args.get('trials', DEFAULT_TRIALS))
+    if not 1 <= trials <= MAX_TRIALS:
+        raise ValueError(f"trials must be within [1, {MAX_TRIALS}]")
+    time_budget_ms = min(max(int(args.get('time_budget_ms', DEFAULT_TIME_BUDGET_MS)), 1), MAX_TIME_BUDGET_MS)
+    seed = args.get('seed')
+    if seed not in (None, ''):
+        seed = int(seed)
+        time_budget_ms = None
+    else:
+        seed = int(np.random.SeedSequence().entropy % (2 ** 32))
+    rules = BannerRules(
+        rate_up=float(args.get('rate_up', 0.35)),
+        fifty_fifty=args.get('fifty_fifty', '0') in ('1', 'true'),
+        spark=int(args.get('spark', DEFAULT_SPARK[pool_type])),
+        spark_progress=int(args.get('spark_progress', 0)),
+    )
+    return pulls, trials, time_budget_ms, seed, rules
+
+
+@simulate_bp.route('/api/simulate/<string:game_uid>')
+@login_required
+def simulate_plan(game_uid):
+    """模拟抽卡计划获得目标干员的概率 (API路由)
+
+    参数：pulls（必填）, pool_type (limited/standard/joint_op), pity（覆盖当前水位）,
+    rate_up, fifty_fifty, spark（默认仅限定寻访为 300）, spark_progress, trials, seed, time_budget_ms
+
+    指定 seed 时忽略 time_budget_ms 并完成全部试验；否则超出时间预算时返回 truncated: true
+    与实际完成的试验数 trials。
+    """
+    pool_type = request.args.get('pool_type', 'limited')
+    if pool_type not in POOL_TYPES:
+        return jsonify({"error": f"Unsupported pool_type: {pool_type}"}), 400
+    try:
+        pulls, trials, time_budget_ms, seed, rules = _parse_simulation_args(request.args, pool_type)
+        pity_override = request.args.get('pity')
+        pity_override = int(pity_override) if pity_override not in (None, '') else None
+    except ValueError as e:
+        return jsonify({"error": f"Invalid parameter: {str(e)}"}), 400
+
+    if pity_override is None:
+        account_data, error = get_account_data(current_user.username, game_uid)
+        if error:
+            return jsonify(error[0]), error[1]
+        current_pity = account_data.pity_state.current_pity(POOL_TYPES[pool_type])
+    else:
+        current_pity = pity_override
+
+    result = run_simulation(pulls, current_pity, rules, trials, seed, time_budget_ms)
+    result["pool_type"] = pool_type
+    return jsonify(result)
@@ -1,9 +1,19 @@
-import json
-from pathlib import Path
-from flask import Blueprint, jsonify, current_app
+from flask import Blueprint, jsonify, request
 from flask_login import login_required, current_user
 from collections import Counter
+import numpy as np
 from datetime import datetime
+from app.api.http_cache import conditional_data_response, OPERATOR_CATALOG_PATHS, POOL_CATALOG_PATHS
+from app.api.account_cache import get_account_data
+from app.api.pull_index import PullIndex
+from app.api.pity_state import PityTracker, LIMITED, STANDARD, JOINT_OP
+from app.api.history import _parse_time
+from solvers.pool_catalog import get_pool_catalog
+from solvers.operator_catalog import get_operator_catalog
+from app.api.pity_model import (
+    six_star_rate, pity_outlook, mean_pity_percentile, ks_test,
+    OFFICIAL_RARITY_RATES, expected_rarity_rates, chi_square_rarity_test
+)
 
 stats_bp = Blueprint('stats_bp', __name__)
 
@@ -11,70 +21,37 @@ stats_bp = Blueprint('stats_bp', __name__)
 
 def calculate_prob(current_pity):
     """根据当前水位计算下一次出六星的概率"""
-    pull_number = current_pity + 1
-    if pull_number <= 50:
-        return 0.02
-    else:
-        prob = 0.02 + (pull_number - 50) * 0.02
-        return min(prob, 1.0)
-
-def get_average_pity(pulls):
-    """计算六星的平均出货抽数"""
-    pity_counter = 0
-    pity_list = []
-    for pull in pulls:
-        pity_counter += 1
-        if pull['rarity'] == 6:
-            pity_list.append(pity_counter)
-            pity_counter = 0
-    if not pity_list:
-        return 0
-    return sum(pity_list) / len(pity_list)
-
-def get_current_pity(pulls):
-    """计算当前水位"""
-    pity = 0
-    for pull in reversed(pulls):
-        if pull['rarity'] == 6:
-            break
-        pity += 1
-    return pity
-
-def analyze_pool_data(pulls):
-    """对单个卡池类型的抽卡记录进行全面分析"""
-    if not pulls:
-        return {
-            "total_pulls": 0,
-            "average_pity": 0,
-            "current_pity": 0,
-            "current_prob": 0.02
-        }
-    
-    # 按时间戳正序排序
-    pulls.sort(key=lambda x: x['ts'])
-    
-    current_pity = get_current_pity(pulls)
-    
-    # 特殊规则：对于限定池，需要找到最近抽的那个池子来计算水位
-    # (此简化版本暂时不对限定池做特殊处理，后续可迭代)
-
-    return {
-        "total_pulls": len(pulls),
-        "average_pity": get_average_pity(pulls),
+    return six_star_rate(current_pity + 1)
+
+def analyze_pool_data(pity_state, pool_type):
+    """根据保底状态机的结果分析单个卡池类型
+
+    限定池按卡池分别计算保底，当前水位取最近抽取的限定池；标准池与中坚池各自共享保底。
+    """
+    intervals = pity_state.intervals.get(pool_type, [])
+    current_pity = pity_state.current_pity(pool_type)
+    stats = {
+        "total_pulls": pity_state.totals.get(pool_type, 0),
+        "average_pity": sum(intervals) / len(intervals) if intervals else 0,
         "current_pity": current_pity,
-        "current_prob": calculate_prob(current_pity)
+        "current_prob": calculate_prob(current_pity),
+        # 基于精确概率表的水位展望（查表，不做模拟）
+        "outlook": pity_outlook(current_pity)
     }
+    if pool_type == LIMITED:
+        stats["current_banner"] = pity_state.current_banner(pool_type)
+    return stats
 
 
 # --- 核心计算函数 ---
 
-def _calculate_dashboard_summary(all_pulls):
+def _calculate_dashboard_summary(all_pulls, pull_index=None, pity_state=None):
     """计算仪表盘统计数据的核心逻辑"""
     if not all_pulls:
         return {
-            "limited": {"total_pulls": 0, "average_pity": 0, "current_pity": 0, "current_prob": 0.02},
-            "standard": {"total_pulls": 0, "average_pity": 0, "current_pity": 0, "current_prob": 0.02},
-            "joint_op": {"total_pulls": 0, "average_pity": 0, "current_pity": 0, "current_prob": 0.02},
+            "limited": {"total_pulls": 0, "average_pity": 0, "current_pity": 0, "current_prob": 0.02, "outlook": pity_outlook(0), "current_banner": None},
+            "standard": {"total_pulls": 0, "average_pity": 0, "current_pity": 0, "current_prob": 0.02, "outlook": pity_outlook(0)},
+            "joint_op": {"total_pulls": 0, "average_pity": 0, "current_pity": 0, "current_prob": 0.02, "outlook": pity_outlook(0)},
             "global_stats": {
                 "total_pulls": 0,
                 "rarity_counts": {"six_star": 0, "five_star": 0, "four_star": 0, "three_star": 0},
@@ -82,22 +59,18 @@ def _calculate_dashboard_summary(all_pulls):
             }
         }
 
-    # 2. 分类数据
-    limited_pulls = [p for p in all_pulls if p['pool_type'] == 0]
-    standard_pulls = [p for p in all_pulls if p['pool_type'] == 1]
-    joint_op_pulls = [p for p in all_pulls if p['pool_type'] == 2]
+    # 2. 按卡池家族计算保底状态（一次遍历；传入缓存的状态时不再遍历）
+    pull_index = pull_index or PullIndex(all_pulls)
+    pity_state = pity_state or PityTracker().feed(all_pulls)
 
     # 3. 分类计算
-    limited_stats = analyze_pool_data(limited_pulls)
-    standard_stats = analyze_pool_data(standard_pulls)
-    joint_op_stats = analyze_pool_data(joint_op_pulls)
+    limited_stats = analyze_pool_data(pity_state, LIMITED)
+    standard_stats = analyze_pool_data(pity_state, STANDARD)
+    joint_op_stats = analyze_pool_data(pity_state, JOINT_OP)
 
     # 4. 全局统计
     total_pulls_all = len(all_pulls)
-    rarity_counts = {6: 0, 5: 0, 4: 0, 3: 0}
-    for pull in all_pulls:
-        if pull['rarity'] in rarity_counts:
-            rarity_counts[pull['rarity']] += 1
+    rarity_counts = {rarity: pull_index.rarity_count(rarity) for rarity in (6, 5, 4, 3)}
 
     global_stats = {
         "total_pulls": total_pulls_all,
@@ -125,142 +98,227 @@ def _calculate_dashboard_summary(all_pulls):
     
     return response_data
 
+POOL_TYPE_KEYS = (("limited", LIMITED), ("standard", STANDARD), ("joint_op", JOINT_OP))
+
+def _score_pity_intervals(intervals):
+    """将六星出货抽数与理论分布比较：均值百分位与 KS 拟合检验"""
+    ks_statistic, ks_p_value = ks_test(intervals)
+    percentile = mean_pity_percentile(intervals)
+    return {
+        "intervals": len(intervals),
+        "mean_percentile": percentile,
+        "luckier_than": None if percentile is None else 1.0 - percentile,
+        "ks_statistic": ks_statistic,
+        "ks_p_value": ks_p_value
+    }
+
+def _calculate_luck_report(all_pulls, pull_index=None, pity_state=None):
+    """运气评估：各卡池类型的六星间隔评分，以及稀有度出率与官方出率的对比 (核心逻辑)"""
+    pull_index = pull_index or PullIndex(all_pulls)
+    pity_state = pity_state or PityTracker().feed(all_pulls)
+    report = {}
+    for key, pool_type in POOL_TYPE_KEYS:
+        report[key] = _score_pity_intervals(pity_state.intervals.get(pool_type, []))
+
+    total = len(all_pulls)
+    rarity_counts = {rarity: pull_index.rarity_count(rarity) for rarity in OFFICIAL_RARITY_RATES}
+    expected_rates = expected_rarity_rates()
+    rarity_rates = []
+    for rarity, official_rate in OFFICIAL_RARITY_RATES.items():
+        expected = expected_rates[rarity]
+        count = rarity_counts[rarity]
+        rarity_rates.append({
+            "rarity": rarity,
+            "count": count,
+            "observed_rate": count / total if total else 0,
+            "official_rate": official_rate,
+            "expected_rate": expected,
+            "z_score": (count - total * expected) / (total * expected * (1 - expected)) ** 0.5 if total else None
+        })
+    chi_square, chi_square_p_value = chi_square_rarity_test(rarity_counts)
+    report["rarity_rates"] = rarity_rates
+    report["rarity_chi_square"] = chi_square
+    report["rarity_chi_square_p_value"] = chi_square_p_value
+    return report
+
+def _account_luck_report(account_data):
+    """运气评估结果随数据版本缓存，同一版本只计算一次"""
+    return account_data.aggregate(
+        "luck", lambda: _calculate_luck_report(account_data.pulls, account_data.index, account_data.pity_state))
+
 # --- API Endpoint ---
 
 def _get_all_pulls(username, game_uid):
-    """辅助函数：读取、解析并返回一个用户账号的所有抽卡记录"""
-    # 注意：这里不再使用 current_app，而是直接使用传入的 username
-    users_dir = Path("users")  # 假设工作目录是项目根目录
-    data_file = users_dir / username / 'accounts' / game_uid / 'data.json'
+    """辅助函数：返回一个用户账号的所有抽卡记录（按时间升序）
 
-    if not data_file.exists():
+    记录按数据版本缓存在进程内，data.json 未变化时不会重复解析。
+    """
+    account_data, error = get_account_data(username, game_uid)
+    if error:
         # 返回错误信息和状态码，让调用者处理
-        return None, ({"error": "Data file not found"}, 404)
+        return None, error
+    return account_data.pulls, None
+
+
+def _account_dashboard_summary(account_data):
+    """账号的仪表盘统计（含运气评估），随数据版本缓存
+
+    /dashboard_summary、bundle 的 summary 分区与服务端渲染的页面共用这一结果。
+    """
+    return account_data.aggregate("dashboard_summary", lambda: {
+        **_calculate_dashboard_summary(account_data.pulls, account_data.index, account_data.pity_state),
+        "luck": _account_luck_report(account_data)
+    })
 
-    try:
-        with open(data_file, 'r', encoding='utf-8') as f:
-            gacha_data = json.load(f)
-    except (IOError, json.JSONDecodeError) as e:
-        return None, ({"error": f"Failed to read or parse data file: {str(e)}"}, 500)
-
-    all_pulls = []
-    for ts, record in gacha_data.items():
-        for char_name, rarity, is_new in record['c']:
-            all_pulls.append({
-                "ts": int(ts),
-                "pool_name": record['p'],
-                "pool_type": record['pt'],
-                "char_name": char_name,
-                "rarity": rarity,
-                "is_new": is_new
-            })
-    
-    all_pulls.sort(key=lambda x: x['ts'])
-    return all_pulls, None
+
+def _load_dashboard_summary(username, game_uid):
+    """读取账号数据并计算仪表盘统计，无数据时返回 None（供页面延迟渲染使用）"""
+    account_data, error = get_account_data(username, game_uid)
+    if error or not account_data.pulls:
+        return None
+    return _account_dashboard_summary(account_data)
 
 
 @stats_bp.route('/api/stats/<string:game_uid>/dashboard_summary')
 @login_required
+@conditional_data_response
 def get_dashboard_summary(game_uid):
     """提供全局数据仪表盘所需的统计数据 (API路由)"""
-    all_pulls, error = _get_all_pulls(current_user.username, game_uid)
+    account_data, error = get_account_data(current_user.username, game_uid)
     if error:
         return jsonify(error[0]), error[1]
         
-    response_data = _calculate_dashboard_summary(all_pulls)
-    return jsonify(response_data)
+    return jsonify(_account_dashboard_summary(account_data))
+
+
+@stats_bp.route('/api/stats/<string:game_uid>/luck')
+@login_required
+@conditional_data_response
+def get_luck_report(game_uid):
+    """六星出货运气评估与稀有度出率对比 (API路由)"""
+    account_data, error = get_account_data(current_user.username, game_uid)
+    if error:
+        return jsonify(error[0]), error[1]
+    return jsonify(_account_luck_report(account_data))
 
 
 # --- 新增图表和详情 API ---
 
-def _calculate_pulls_by_pool(all_pulls):
-    """按卡池名称分组，统计总抽数 (核心逻辑)"""
+def _calculate_pulls_by_pool(all_pulls, pull_index=None):
+    """按卡池名称分组，统计总抽数 (核心逻辑)
+
+    传入 pull_index 时直接读取卡池索引，复杂度与卡池数量相关而与抽数无关。
+    """
     if not all_pulls:
         return []
-    pool_counts = Counter(p['pool_name'] for p in all_pulls)
+    pull_index = pull_index or PullIndex(all_pulls)
     
-    # 创建一个按时间顺序排列的唯一卡池名称列表
-    ordered_unique_pools = []
-    seen_pools = set()
-    for pull in all_pulls:
-        pool_name = pull['pool_name']
-        if pool_name not in seen_pools:
-            ordered_unique_pools.append(pool_name)
-            seen_pools.add(pool_name)
-    
-    # 根据有序列表构建结果，确保按首次出现时间排序
-    result = [{"name": name, "value": pool_counts[name]} for name in ordered_unique_pools]
-    return result
+    # 根据卡池首次出现时间排序
+    return [{"name": name, "value": len(pull_index.pool_positions(name))}
+            for name in pull_index.pools_in_order()]
 
 def _calculate_pulls_by_month(all_pulls):
     """按“年-月”分组，统计总抽数 (核心逻辑)"""
     if not all_pulls:
         return []
-    month_counts = Counter(datetime.fromtimestamp(p['ts']).strftime('%Y-%m') for p in all_pulls)
+    month_counts = Counter(datetime.fromtimestamp(p.ts).strftime('%Y-%m') for p in all_pulls)
     # 转换为 ECharts 需要的格式并按月份排序
     result = [{"name": name, "value": value} for name, value in sorted(month_counts.items())]
     return result
 
-def _calculate_pool_list_and_latest(all_pulls):
+def _calculate_pool_list_and_latest(all_pulls, pull_index=None):
     """获取用户寻访过的所有卡池的唯一名称列表，并附带最新的卡池名 (核心逻辑)"""
     if not all_pulls:
         return {"pool_list": [], "latest_pool": None}
+    pull_index = pull_index or PullIndex(all_pulls)
     # all_pulls 已经按时间戳升序排序
-    latest_pool_name = all_pulls[-1]['pool_name']
-    # 获取所有唯一的卡池名并排序
-    pool_names = sorted(list(set(p['pool_name'] for p in all_pulls)))
+    latest_pool_name = all_pulls[-1].pool_name
     return {
-        "pool_list": pool_names,
+        "pool_list": sorted(pull_index.by_pool),
         "latest_pool": latest_pool_name
     }
 
-def _calculate_pool_details(all_pulls, pool_name):
-    """提供指定卡池的详细寻访分析 (核心逻辑)"""
+def _calculate_pool_details(all_pulls, pool_name, pull_index=None):
+    """提供指定卡池的详细寻访分析 (核心逻辑)
+
+    卡池内的记录与六星水位通过 pull_index 查找，不再扫描全部抽卡记录。
+    """
+    pool_info = get_pool_catalog().by_name.get(pool_name)
+    pool_info = pool_info.to_dict() if pool_info is not None else None
     if not all_pulls:
         return {
             "pool_name": pool_name,
+            "pool_info": pool_info,
             "total_pulls": 0,
             "six_star_list": []
         }
-    pool_pulls = [p for p in all_pulls if p['pool_name'] == pool_name]
-    if not pool_pulls:
-        return {
-            "pool_name": pool_name,
-            "total_pulls": 0,
-            "six_star_list": []
-        }
+    pull_index = pull_index or PullIndex(all_pulls)
     six_star_list = []
-    pity_counter = 0
-    for pull in pool_pulls:
-        pity_counter += 1
-        if pull['rarity'] == 6:
-            six_star_list.append({
-                "char_name": pull['char_name'],
-                "pity": pity_counter,
-                "is_new": pull['is_new'],
-                "ts": pull['ts']
-            })
-            pity_counter = 0
+    for position, pity in pull_index.pool_six_stars(all_pulls, pool_name):
+        pull = all_pulls[position]
+        six_star_list.append({
+            "char_name": pull.char_name,
+            "pity": pity,
+            "is_new": pull.is_new,
+            "ts": pull.ts
+        })
     return {
         "pool_name": pool_name,
-        "total_pulls": len(pool_pulls),
+        "pool_info": pool_info,
+        "total_pulls": len(pull_index.pool_positions(pool_name)),
+        "six_star_list": six_star_list
+    }
+
+def _calculate_range_summary(all_pulls, lo, hi, pull_index=None):
+    """统计下标区间 [lo, hi)（即一段时间范围）内的抽卡情况 (核心逻辑)
+
+    稀有度计数来自前缀和，卡池计数与六星列表来自下标数组上的二分查找。
+    """
+    pull_index = pull_index or PullIndex(all_pulls)
+    by_pool = []
+    for name in pull_index.pools_in_order():
+        count = pull_index.count_positions(pull_index.pool_positions(name), lo, hi)
+        if count:
+            by_pool.append({"name": name, "value": count})
+
+    six_star_list = []
+    for position in pull_index.slice_positions(pull_index.by_rarity[6], lo, hi):
+        pull = all_pulls[position]
+        six_star_list.append({
+            "char_name": pull.char_name,
+            "pool_name": pull.pool_name,
+            "is_new": pull.is_new,
+            "ts": pull.ts
+        })
+
+    return {
+        "total_pulls": hi - lo,
+        "rarity_counts": {
+            "six_star": pull_index.rarity_count(6, lo, hi),
+            "five_star": pull_index.rarity_count(5, lo, hi),
+            "four_star": pull_index.rarity_count(4, lo, hi),
+            "three_star": pull_index.rarity_count(3, lo, hi)
+        },
+        "pulls_by_pool": by_pool,
         "six_star_list": six_star_list
     }
 
 
 @stats_bp.route('/api/stats/<string:game_uid>/pulls_by_pool')
 @login_required
+@conditional_data_response
 def get_pulls_by_pool(game_uid):
     """按卡池名称分组，统计总抽数 (API路由)"""
-    all_pulls, error = _get_all_pulls(current_user.username, game_uid)
+    account_data, error = get_account_data(current_user.username, game_uid)
     if error:
         return jsonify(error[0]), error[1]
-    result = _calculate_pulls_by_pool(all_pulls)
+    result = _calculate_pulls_by_pool(account_data.pulls, account_data.index)
     return jsonify(result)
 
 
 @stats_bp.route('/api/stats/<string:game_uid>/pulls_by_month')
 @login_required
+@conditional_data_response
 def get_pulls_by_month(game_uid):
     """按“年-月”分组，统计总抽数 (API路由)"""
     all_pulls, error = _get_all_pulls(current_user.username, game_uid)
@@ -272,21 +330,175 @@ def get_pulls_by_month(game_uid):
 
 @stats_bp.route('/api/utils/<string:game_uid>/pool_list')
 @login_required
+@conditional_data_response
 def get_pool_list(game_uid):
     """获取用户寻访过的所有卡池的唯一名称列表，并附带最新的卡池名 (API路由)"""
-    all_pulls, error = _get_all_pulls(current_user.username, game_uid)
+    account_data, error = get_account_data(current_user.username, game_uid)
     if error:
         return jsonify(error[0]), error[1]
-    result = _calculate_pool_list_and_latest(all_pulls)
+    result = _calculate_pool_list_and_latest(account_data.pulls, account_data.index)
     return jsonify(result)
 
 
 @stats_bp.route('/api/stats/<string:game_uid>/pool_details/<path:pool_name>')
 @login_required
+@conditional_data_response(catalog_paths=POOL_CATALOG_PATHS)
 def get_pool_details(game_uid, pool_name):
     """提供指定卡池的详细寻访分析 (API路由)"""
-    all_pulls, error = _get_all_pulls(current_user.username, game_uid)
+    account_data, error = get_account_data(current_user.username, game_uid)
+    if error:
+        return jsonify(error[0]), error[1]
+    result = _calculate_pool_details(account_data.pulls, pool_name, account_data.index)
+    return jsonify(result)
+
+
+# --- 干员职业 / 阵营分布 ---
+
+OPERATOR_DIMENSIONS = ("class", "faction")
+
+def _positions_array(positions):
+    """将 PullIndex 的下标数组 (array('i')) 零拷贝转换为 NumPy 数组"""
+    return np.frombuffer(positions, dtype=np.intc) if len(positions) else np.empty(0, dtype=np.intc)
+
+def _build_operator_ids(all_pulls, pull_index=None):
+    """每条抽卡记录对应的干员 ID 数组；按干员名索引批量填充，只查目录一次/干员"""
+    pull_index = pull_index or PullIndex(all_pulls)
+    catalog = get_operator_catalog()
+    operator_ids = np.empty(len(all_pulls), dtype=np.int32)
+    for char_name, positions in pull_index.by_char.items():
+        operator_ids[_positions_array(positions)] = catalog.operator_id(char_name)
+    catalog.save()
+    return operator_ids
+
+def _calculate_operator_distribution(operator_ids, dimension, positions=None):
+    """按职业或阵营统计抽到的干员数量 (核心逻辑)
+
+    干员 ID 先映射为职业 / 阵营编码，再用 bincount 一次完成计数。
+    干员目录不完整，目录外干员的抽数单独作为 unknown 返回，coverage 为目录覆盖的抽数比例。
+    """
+    catalog = get_operator_catalog()
+    if dimension == "class":
+        code_of, names = catalog.class_of, catalog.class_names
+    else:
+        code_of, names = catalog.faction_of, catalog.faction_names
+    ids = operator_ids if positions is None else operator_ids[positions]
+    codes = np.asarray(code_of, dtype=np.int32)[ids]
+    counts = np.bincount(codes, minlength=len(names))
+    total = int(counts.sum())
+    unknown = int(counts[0])
+    return {
+        "by": dimension,
+        "distribution": [{"name": names[code], "value": int(count)}
+                         for code, count in enumerate(counts) if code and count],
+        "unknown": unknown,
+        "total": total,
+        "coverage": (total - unknown) / total if total else 0
+    }
+
+
+@stats_bp.route('/api/stats/<string:game_uid>/operator_distribution')
+@login_required
+@conditional_data_response(catalog_paths=OPERATOR_CATALOG_PATHS)
+def get_operator_distribution(game_uid):
+    """按职业 (by=class) 或阵营 (by=faction) 统计干员分布，可用 rarity= 限定稀有度 (API路由)"""
+    dimension = request.args.get('by', 'class')
+    if dimension not in OPERATOR_DIMENSIONS:
+        return jsonify({"error": f"Unsupported dimension: {dimension}"}), 400
+    try:
+        rarities = [int(r) for r in request.args.get('rarity', '').split(',') if r.strip()]
+    except ValueError as e:
+        return jsonify({"error": f"Invalid parameter: {str(e)}"}), 400
+
+    account_data, error = get_account_data(current_user.username, game_uid)
+    if error:
+        return jsonify(error[0]), error[1]
+    operator_ids = account_data.aggregate(
+        "operator_ids", lambda: _build_operator_ids(account_data.pulls, account_data.index))
+    positions = None
+    if rarities:
+        pull_index = account_data.index
+        positions = np.concatenate([_positions_array(pull_index.rarity_positions(r)) for r in rarities])
+    return jsonify(_calculate_operator_distribution(operator_ids, dimension, positions))
+
+
+# --- 聚合 Bundle API ---
+
+# bundle 可选的分区名称，顺序即默认返回顺序
+STATS_BUNDLE_FIELDS = ("summary", "pulls_by_pool", "pulls_by_month", "pool_list", "pool_details")
+
+def _calculate_stats_bundle(account_data, fields=None, pool_name=None):
+    """基于一次加载的账号数据，计算仪表盘所需的多个统计分区 (核心逻辑)
+
+    fields 为 None 时返回全部分区；pool_details 未指定 pool_name 时使用最新卡池。
+    summary 分区与 /dashboard_summary 相同，复用随数据版本缓存的索引与保底状态。
+    """
+    if not fields:
+        fields = STATS_BUNDLE_FIELDS
+    all_pulls = account_data.pulls
+    pull_index = account_data.index
+
+    bundle = {}
+    pool_data = None
+    if "pool_list" in fields or "pool_details" in fields:
+        pool_data = _calculate_pool_list_and_latest(all_pulls, pull_index)
+
+    if "summary" in fields:
+        bundle["summary"] = _account_dashboard_summary(account_data)
+    if "pulls_by_pool" in fields:
+        bundle["pulls_by_pool"] = _calculate_pulls_by_pool(all_pulls, pull_index)
+    if "pulls_by_month" in fields:
+        bundle["pulls_by_month"] = _calculate_pulls_by_month(all_pulls)
+    if "pool_list" in fields:
+        bundle["pool_list"] = pool_data
+    if "pool_details" in fields:
+        target_pool = pool_name or pool_data.get("latest_pool")
+        bundle["pool_details"] = _calculate_pool_details(all_pulls, target_pool, pull_index) if target_pool else None
+    return bundle
+
+
+def _parse_bundle_fields(raw_fields):
+    """解析 fields 参数，返回 (字段元组, 错误信息)"""
+    if not raw_fields:
+        return STATS_BUNDLE_FIELDS, None
+    fields = tuple(f.strip() for f in raw_fields.split(',') if f.strip())
+    unknown = [f for f in fields if f not in STATS_BUNDLE_FIELDS]
+    if unknown:
+        return None, f"Unknown fields: {', '.join(unknown)}"
+    return fields, None
+
+
+@stats_bp.route('/api/stats/<string:game_uid>/bundle')
+@login_required
+@conditional_data_response(catalog_paths=POOL_CATALOG_PATHS)
+def get_stats_bundle(game_uid):
+    """一次请求返回仪表盘所需的全部统计分区，可用 fields= 选择分区 (API路由)"""
+    fields, field_error = _parse_bundle_fields(request.args.get('fields'))
+    if field_error:
+        return jsonify({"error": field_error}), 400
+
+    account_data, error = get_account_data(current_user.username, game_uid)
+    if error:
+        return jsonify(error[0]), error[1]
+    result = _calculate_stats_bundle(account_data, fields, request.args.get('pool_name'))
+    return jsonify(result)
+
+
+@stats_bp.route('/api/stats/<string:game_uid>/range')
+@login_required
+@conditional_data_response
+def get_range_summary(game_uid):
+    """统计指定时间范围内的抽卡情况，from/to 支持 Unix 时间戳或日期 (API路由)"""
+    try:
+        ts_from = _parse_time(request.args.get('from'))
+        ts_to = _parse_time(request.args.get('to'), end_of_day=True)
+    except ValueError as e:
+        return jsonify({"error": f"Invalid parameter: {str(e)}"}), 400
+
+    account_data, error = get_account_data(current_user.username, game_uid)
     if error:
         return jsonify(error[0]), error[1]
-    result = _calculate_pool_details(all_pulls, pool_name)
+    lo, hi = account_data.range_bounds(ts_from, ts_to)
+    result = _calculate_range_summary(account_data.pulls, lo, hi, account_data.index)
+    result["from"] = ts_from
+    result["to"] = ts_to
     return jsonify(result)
@@ -0,0 +1,134 @@
+import gzip
+import os
+import threading
+from flask import request, send_file
+
+try:
+    import brotli
+except ImportError:  # brotli 为可选依赖，未安装时只提供 gzip
+    brotli = None
+
+# 小于该大小的响应直接返回，压缩收益不足以抵消 CPU 开销
+COMPRESS_MIN_SIZE = 1024
+
+COMPRESSIBLE_MIMETYPES = {
+    'application/json',
+    'text/html',
+    'text/csv',
+    'text/plain',
+    'text/css',
+    'application/javascript',
+}
+
+# 编码名 -> 预压缩旁路文件后缀
+SIDECAR_SUFFIXES = {
+    'br': '.br',
+    'gzip': '.gz',
+}
+
+
+def _supported_encodings():
+    """按优先级返回服务器支持的压缩编码"""
+    return ['br', 'gzip'] if brotli is not None else ['gzip']
+
+
+def choose_encoding():
+    """根据请求的 Accept-Encoding 协商压缩编码，不接受压缩时返回 None"""
+    return request.accept_encodings.best_match(_supported_encodings())
+
+
+def compress_bytes(data, encoding, precompress=False):
+    """以指定编码压缩字节串；precompress 为 True 时使用最高压缩等级（用于旁路文件）"""
+    if encoding == 'br':
+        return brotli.compress(data, quality=11 if precompress else 5)
+    return gzip.compress(data, compresslevel=9 if precompress else 6, mtime=0)
+
+
+def encoded_etag(etag, encoding):
+    """不同编码的表示需要不同的强 ETag"""
+    if not encoding or encoding not in SIDECAR_SUFFIXES:
+        return etag
+    return f"{etag}-{encoding}"
+
+
+def etag_variants(etag):
+    """返回一个 ETag 在各种编码下的全部取值"""
+    return [etag] + [encoded_etag(etag, encoding) for encoding in SIDECAR_SUFFIXES]
+
+
+def compress_response(response):
+    """after_request 钩子：对足够大的文本响应按协商结果进行压缩"""
+    response.vary.add('Accept-Encoding')
+
+    if (response.status_code != 200
+            or response.direct_passthrough
+            or response.is_streamed
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+        return response
+
+    data = response.get_data()
+    if len(data) < COMPRESS_MIN_SIZE:
+        return response
+
+    encoding = choose_encoding()
+    if encoding is None:
+        return response
+
+    response.set_data(compress_bytes(data, encoding))
+    response.headers['Content-Encoding'] = encoding
+    etag, is_weak = response.get_etag()
+    if etag and not is_weak:
+        response.set_etag(encoded_etag(etag, encoding))
+    return response
+
+
+def _sidecar_path(source_path, version, encoding):
+    """旁路文件与源文件同目录，文件名包含数据版本，版本变化后自动失效"""
+    return source_path.with_name(f".{source_path.stem}.{version}{source_path.suffix}{SIDECAR_SUFFIXES[encoding]}")
+
+
+def _remove_stale_sidecars(source_path, version):
+    """删除同一源文件其他版本的旁路文件"""
+    prefix = f".{source_path.stem}."
+    current = f".{source_path.stem}.{version}{source_path.suffix}"
+    for item in source_path.parent.iterdir():
+        name = item.name
+        if name.startswith(prefix) and not name.startswith(current) and item.suffix in SIDECAR_SUFFIXES.values():
+            try:
+                item.unlink()
+            except OSError:
+                pass
+
+
+def send_precompressed_file(source_path, version, mimetype):
+    """发送一个按版本不变的静态文件，压缩结果缓存为旁路文件
+
+    同一版本的文件只压缩一次，之后的下载直接发送旁路文件，不再消耗压缩 CPU。
+    """
+    # send_file 会把相对路径解析到应用目录下，这里统一转换为绝对路径
+    source_path = source_path.resolve()
+    encoding = choose_encoding()
+    if encoding is None or source_path.stat().st_size < COMPRESS_MIN_SIZE:
+        return send_file(source_path, mimetype=mimetype, conditional=False, etag=False)
+
+    sidecar = _sidecar_path(source_path, version, encoding)
+    if not sidecar.exists():
+        with open(source_path, 'rb') as f:
+            compressed = compress_bytes(f.read(), encoding, precompress=True)
+        # 先写临时文件再原子替换，避免并发请求读到写了一半的旁路文件
+        tmp_path = sidecar.with_name(f"{sidecar.name}.{os.getpid()}-{threading.get_ident()}.tmp")
+        with open(tmp_path, 'wb') as f:
+            f.write(compressed)
+        os.replace(tmp_path, sidecar)
+        _remove_stale_sidecars(source_path, version)
+
+    response = send_file(sidecar, mimetype=mimetype, conditional=False, etag=False)
+    response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    return response
+
+
+def init_compression(app):
+    """注册响应压缩钩子"""
+    app.after_request(compress_response)
@@ -0,0 +1,104 @@
+"""
+抽卡记录内存占用基准测试
+
+在合成的 10 万抽历史上，比较旧的“每抽一个 dict”表示与紧凑的 Pull 表示
+在单个账号缓存中的内存占用。
+
+用法：python benchmarks/pull_memory.py [抽数]
+"""
+import gc
+import json
+import os
+import random
+import sys
+import tempfile
+import tracemalloc
+from array import array
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.api.pull import pulls_from_gacha_data
+from solvers.pool_catalog import PoolCatalog
+
+POOL_NAMES = [f"限定寻访·第{i}期" for i in range(60)] + ["标准寻访", "中坚寻访"]
+OPERATORS = {
+    6: [f"六星干员{i}" for i in range(90)],
+    5: [f"五星干员{i}" for i in range(120)],
+    4: [f"四星干员{i}" for i in range(60)],
+    3: [f"三星干员{i}" for i in range(20)],
+}
+
+
+def build_synthetic_data(total_pulls, seed=0):
+    """生成 data.json 格式的合成数据，返回 JSON 文本"""
+    rng = random.Random(seed)
+    data = {}
+    ts = 1_600_000_000
+    pulls = 0
+    while pulls < total_pulls:
+        size = 10 if rng.random() < 0.7 else 1
+        pool_name = rng.choice(POOL_NAMES)
+        chars = []
+        for _ in range(size):
+            r = rng.random()
+            rarity = 6 if r < 0.03 else 5 if r < 0.11 else 4 if r < 0.61 else 3
+            chars.append([rng.choice(OPERATORS[rarity]), rarity, 1 if rng.random() < 0.02 else 0])
+        data[str(ts)] = {"p": pool_name, "pt": 1 if pool_name == "标准寻访" else 2 if pool_name == "中坚寻访" else 0, "c": chars}
+        pulls += size
+        ts += rng.randint(10, 3600)
+    return json.dumps(data, ensure_ascii=False), pulls
+
+
+def legacy_pulls(gacha_data):
+    """旧实现：每抽构建一个六键 dict"""
+    all_pulls = []
+    for ts, record in gacha_data.items():
+        for char_name, rarity, is_new in record['c']:
+            all_pulls.append({
+                "ts": int(ts),
+                "pool_name": record['p'],
+                "pool_type": record['pt'],
+                "char_name": char_name,
+                "rarity": rarity,
+                "is_new": is_new
+            })
+    all_pulls.sort(key=lambda x: x['ts'])
+    return all_pulls, [p['ts'] for p in all_pulls]
+
+
+def compact_pulls(gacha_data, catalog):
+    """新实现：Pull + int64 时间戳数组"""
+    pulls = pulls_from_gacha_data(gacha_data, catalog)
+    return pulls, array('q', (p.ts for p in pulls))
+
+
+def measure(builder, raw_json):
+    """返回解析 raw_json 并由 builder 构建的缓存在 data.json 对象释放后仍常驻的字节数"""
+    gc.collect()
+    tracemalloc.start()
+    result = builder(json.loads(raw_json))
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return current
+
+
+def main():
+    total_pulls = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    raw_json, count = build_synthetic_data(total_pulls)
+
+    legacy = measure(legacy_pulls, raw_json)
+    # 合成卡池登记到临时目录中，不写入正式的 users/.pool_catalog.json
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        catalog = PoolCatalog(discovered_path=os.path.join(tmp_dir, "pool_catalog.json"))
+        compact = measure(lambda gacha_data: compact_pulls(gacha_data, catalog), raw_json)
+
+    print(f"合成历史: {count} 抽 (data.json {len(raw_json.encode('utf-8')) / 1024 / 1024:.2f} MiB)")
+    print(f"dict 表示:  {legacy / 1024 / 1024:8.2f} MiB  ({legacy / count:6.1f} B/抽)")
+    print(f"Pull 表示:  {compact / 1024 / 1024:8.2f} MiB  ({compact / count:6.1f} B/抽)")
+    print(f"缩减倍数:   {legacy / compact:8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,68 +1,150 @@
-import json
-
-def map_pool_type(pool_name):
-    """根据卡池名称映射 pt 值"""
-    if "标准寻访" in pool_name or "常驻标准寻访" in pool_name:
-        return 1
-    elif "中坚寻访" in pool_name or "中坚甄选" in pool_name:
-        return 2
-    else:
-        # 默认为限定寻访
-        return 0
-
-def convert_source_data(source_data):
-    """将源数据转换为目标格式"""
-    converted = {}
-    for timestamp, record in source_data["data"].items():
-        # 转换干员列表，星级+1
-        converted_chars = []
-        for char in record["c"]:
-            name, rarity, is_new = char
-            converted_chars.append([name, rarity + 1, is_new])
-        
-        # 创建新记录
-        converted[timestamp] = {
-            "p": record["p"],
-            "pt": map_pool_type(record["p"]),
-            "c": converted_chars
-        }
-    return converted
-
-def merge_data(existing_data, new_data):
-    """合并现有数据和新数据，避免重复"""
-    merged = existing_data.copy()
-    
-    for timestamp, record in new_data.items():
-        # 如果时间戳不存在于现有数据中，则添加
-        if timestamp not in merged:
-            merged[timestamp] = record
-        # 如果存在，可以选择跳过或覆盖，这里我们选择跳过
-        # 如果需要覆盖，可以去掉下面的else if注释并调整逻辑
-        # else:
-        #     print(f"Timestamp {timestamp} already exists. Skipping.")
-            
-    return merged
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from solvers.gacha_data_importer import detect_export_uid, read_export_file, assign_pool_types, PoolTypeMapper
+from solvers.gacha_data_storer import GachaDataStorer
+from solvers.json_stream import SizeLimitError
+from solvers.record_merge import KEEP_EXISTING
+from user_system.catalog import get_user_catalog
+
+def collect_source_files(paths):
+    """展开命令行参数中的文件与目录（目录下的全部 .json 文件）"""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(os.path.join(path, name) for name in sorted(os.listdir(path))
+                         if name.endswith(".json"))
+        else:
+            files.append(path)
+    return files
+
+def find_account_owners():
+    """根据用户目录索引，返回 游戏UID -> 拥有该账号的系统用户名列表"""
+    owners = {}
+    for user_uid, game_uid, _ in get_user_catalog().all_accounts():
+        owners.setdefault(game_uid, []).append(user_uid)
+    return owners
+
+def parse_source_file(path):
+    """在子进程中解析并转换一个导出文件
+
+    只读取文件，返回的记录保留原始卡池名、尚未解析卡池类型 (pt)，子进程不访问卡池目录。
+    """
+    try:
+        game_uid = detect_export_uid(path)
+        records = read_export_file(path)
+        return {"path": path, "uid": game_uid, "records": records,
+                "bytes": os.path.getsize(path), "error": None}
+    except Exception as e:
+        return {"path": path, "uid": None, "records": None, "bytes": 0, "error": str(e)}
+
+def resolve_owner(game_uid, owners, default_user):
+    """确定导入到哪个系统用户：指定了 --user 时直接使用，否则账号必须唯一归属于某个用户"""
+    if default_user:
+        return default_user, None
+    users = owners.get(game_uid, [])
+    if not users:
+        return None, f"未找到游戏账号 {game_uid}，请先添加账号或使用 --user 指定用户"
+    if len(users) > 1:
+        return None, f"游戏账号 {game_uid} 属于多个用户 ({', '.join(users)})，请使用 --user 指定"
+    return users[0], None
+
+def run_batch_import(paths, default_user=None, workers=None):
+    """
+    批量导入第三方导出文件。
+
+    文件的解析与转换在进程池中并行执行；卡池类型的解析与写入由主进程依次完成，
+    同一账号的多个文件不会并发写入，干员与卡池目录也只在主进程中登记新条目。
+    """
+    files = collect_source_files(paths)
+    if not files:
+        print("没有找到需要导入的文件")
+        return False
+
+    owners = find_account_owners()
+    storer = GachaDataStorer()
+    totals = {"files": 0, "failed": 0, "records": 0, "imported": 0, "skipped": 0, "conflicts": 0, "bytes": 0}
+    start = time.perf_counter()
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(parse_source_file, path) for path in files]
+        for future in as_completed(futures):
+            result = future.result()
+            path = result["path"]
+            totals["files"] += 1
+
+            error = result["error"]
+            if error is None and not result["uid"]:
+                error = "无法从文件名或文件内容中确定游戏UID"
+            if error is None:
+                user_uid, error = resolve_owner(result["uid"], owners, default_user)
+            if error is None:
+                records = result["records"]
+                pool_types = PoolTypeMapper()
+                merge = None
+                try:
+                    assign_pool_types(records, pool_types)
+                    if records:
+                        merge = storer.save_converted_records(records, user_uid, result["uid"],
+                                                              prefer=KEEP_EXISTING, precise=False)
+                        if merge is None:
+                            error = "保存数据失败"
+                except SizeLimitError as e:
+                    error = str(e)
+                if error is not None:
+                    pool_types.discard()
+            if error is not None:
+                totals["failed"] += 1
+                print(f"[失败] {path}: {error}")
+                continue
+
+            imported = merge.added if merge else 0
+            conflicts = len(merge.conflicts) if merge else 0
+            totals["records"] += len(records)
+            totals["imported"] += imported
+            totals["skipped"] += len(records) - imported
+            totals["conflicts"] += conflicts
+            totals["bytes"] += result["bytes"]
+            print(f"[完成] {path} -> {user_uid}/{result['uid']}: "
+                  f"新增 {imported} 条，跳过 {len(records) - imported} 条，冲突 {conflicts} 条")
+
+    elapsed = time.perf_counter() - start
+    print("--- 导入汇总 ---")
+    print(f"文件: {totals['files']} 个（失败 {totals['failed']} 个）")
+    print(f"记录: 读取 {totals['records']} 条，新增 {totals['imported']} 条，"
+          f"跳过 {totals['skipped']} 条，冲突 {totals['conflicts']} 条")
+    print(f"耗时: {elapsed:.2f} 秒，吞吐: {totals['records'] / elapsed:.0f} 条/秒，"
+          f"{totals['bytes'] / elapsed / (1024 * 1024):.2f} MB/秒")
+    return totals["failed"] == 0
 
 def main():
-    # 读取源文件 (684774691.json)
-    with open('684774691.json', 'r', encoding='utf-8') as f:
-        source_data = json.load(f)
-    
-    # 读取目标文件 (users/Arno/accounts/684774691/data.json)
-    with open('users/Arno/accounts/684774691/data.json', 'r', encoding='utf-8') as f:
-        existing_data = json.load(f)
-    
-    # 转换源数据
-    converted_data = convert_source_data(source_data)
-    
-    # 合并数据
-    merged_data = merge_data(existing_data, converted_data)
-    
-    # 写入新文件
-    with open('684774691_converted.json', 'w', encoding='utf-8') as f:
-        json.dump(merged_data, f, indent=2, ensure_ascii=False)
-    
-    print("数据转换和合并完成，结果已保存到 684774691_converted.json")
+    parser = argparse.ArgumentParser(description="明日方舟人事部档案 - 第三方抽卡记录批量导入工具")
+    parser.add_argument(
+        "sources",
+        nargs="+",
+        help="导出文件或包含导出文件的目录 (例如: 684774691.json exports/)"
+    )
+    parser.add_argument(
+        "--user",
+        type=str,
+        default=None,
+        help="导入到指定的系统用户；不指定时根据游戏UID在 users 目录中查找账号归属"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="解析文件的进程数 (默认: CPU 核心数)"
+    )
+
+    args = parser.parse_args()
+    success = run_batch_import(args.sources, args.user, args.workers)
+
+    if success:
+        print("所有文件已成功导入。")
+    else:
+        print("部分文件导入失败，请检查日志。")
 
 if __name__ == "__main__":
     main()
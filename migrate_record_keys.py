@@ -0,0 +1,46 @@
+import argparse
+import os
+from solvers.gacha_data_storer import GachaDataStorer
+
+def migrate_all_accounts(users_base_path="users"):
+    """
+    将所有账号的 data.json 从秒级键升级为毫秒级 gachaTs 键。
+    已迁移的账号会被跳过；未迁移的账号在下一次保存数据时也会自动迁移。
+    """
+    storer = GachaDataStorer(users_base_path=users_base_path)
+    migrated_count = 0
+    failure_count = 0
+
+    if not os.path.isdir(users_base_path):
+        print(f"用户目录 {users_base_path} 不存在")
+        return False
+
+    for user_uid in sorted(os.listdir(users_base_path)):
+        accounts_dir = os.path.join(users_base_path, user_uid, "accounts")
+        if not os.path.isdir(accounts_dir):
+            continue
+        for game_uid in sorted(os.listdir(accounts_dir)):
+            if not os.path.exists(os.path.join(accounts_dir, game_uid, "data.json")):
+                continue
+            if storer.migrate_account_data(user_uid, game_uid):
+                migrated_count += 1
+            else:
+                failure_count += 1
+
+    print(f"迁移完成，成功: {migrated_count}, 失败: {failure_count}")
+    return failure_count == 0
+
+def main():
+    parser = argparse.ArgumentParser(description="明日方舟人事部档案 - 寻访记录键格式迁移工具")
+    parser.add_argument(
+        "--users-dir",
+        type=str,
+        default="users",
+        help="用户数据根目录 (默认: users)"
+    )
+
+    args = parser.parse_args()
+    migrate_all_accounts(args.users_dir)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,24 @@
+import argparse
+from user_system.catalog import get_user_catalog, USERS_BASE_PATH
+
+def main():
+    """
+    遍历 users 目录重建用户与游戏账号目录索引 (users/.catalog/)。
+    索引与实际目录不一致时（例如手动复制或删除了用户目录）使用。
+    """
+    parser = argparse.ArgumentParser(description="明日方舟人事部档案 - 重建用户目录索引")
+    parser.add_argument(
+        "--users-dir",
+        type=str,
+        default=USERS_BASE_PATH,
+        help="用户数据根目录 (默认: users)"
+    )
+
+    args = parser.parse_args()
+    catalog = get_user_catalog(args.users_dir)
+    count = catalog.rebuild()
+    accounts = len(catalog.all_accounts())
+    print(f"用户目录索引已重建: {count} 个用户, {accounts} 个游戏账号 -> {catalog.catalog_dir}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+import json
+import os
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows 没有 fcntl，使用 msvcrt 的字节锁
+    fcntl = None
+    import msvcrt
+
+# 同一进程内的线程之间 flock 不互斥（同一进程重复加锁总是成功），需要额外的线程锁
+_thread_locks = {}
+_thread_locks_guard = threading.Lock()
+
+
+def _thread_lock(lock_path):
+    key = os.path.abspath(lock_path)
+    with _thread_locks_guard:
+        return _thread_locks.setdefault(key, threading.RLock())
+
+
+@contextmanager
+def file_lock(path):
+    """跨进程的排他锁：锁住 <path>.lock（阻塞直到获得）
+
+    Web 服务、定时更新脚本与命令行工具是不同的进程，修改共享的 JSON 文件
+    （读取 - 修改 - 原子替换）时需要在锁内重新读取文件，否则会丢失其他进程的修改。
+    """
+    lock_path = f"{path}.lock"
+    os.makedirs(os.path.dirname(lock_path) or ".", exist_ok=True)
+    with _thread_lock(lock_path):
+        with open(lock_path, "a+b") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+            else:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+                try:
+                    yield
+                finally:
+                    lock_file.seek(0)
+                    msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def file_mtime(path):
+    """文件的修改时间 (纳秒)，文件不存在时返回 None"""
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+def read_json(path):
+    """读取 JSON 文件，文件不存在或无法解析时返回 {}"""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+    except (IOError, ValueError) as e:
+        print(f"读取 {path} 时出错: {e}")
+        return {}
+
+
+def atomic_write_json(path, data, indent=None):
+    """先写临时文件再原子替换，读取方不会读到写了一半的文件"""
+    tmp_path = f"{path}.{os.getpid()}-{threading.get_ident()}.tmp"
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=indent)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
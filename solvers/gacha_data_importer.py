@@ -1,112 +1,191 @@
-import json
 import os
-from typing import Dict, Any
+import re
+from itertools import chain
+from typing import Dict, Any, BinaryIO, Iterator, Optional, Tuple
+from .pool_catalog import get_pool_catalog
+from .json_stream import iter_json_object, SizeLimitError
+from .gacha_data_storer import GachaDataStorer
+from .record_merge import NotDescendingError, KEEP_EXISTING
 
+# 单个导入文件的大小与记录数上限
+MAX_IMPORT_BYTES = 50 * 1024 * 1024
+MAX_IMPORT_RECORDS = 500_000
+# 单个导入文件最多可以登记的新卡池数（正常账号的全部历史也只有一两百个卡池）
+MAX_IMPORT_NEW_POOLS = 500
 
-def map_pool_type(pool_name: str) -> int:
-    """
-    根据卡池名称映射 pt 值。
-    0: 限定寻访
-    1: 标准寻访
-    2: 中坚寻访
+
+class PoolTypeMapper:
+    """一次导入中的卡池类型映射：通过卡池目录映射 pt 值，并限制登记的新卡池数量
+
+    pt 值：0 限定寻访，1 标准寻访，2 中坚寻访。导入失败时调用 discard() 撤销本次登记的新卡池。
     """
-    if "标准寻访" in pool_name or "常驻标准寻访" in pool_name:
-        return 1
-    elif "中坚寻访" in pool_name or "中坚甄选" in pool_name:
-        return 2
-    else:
-        # 默认为限定寻访
-        return 0
-
-
-def convert_source_data(source_data: Dict[str, Any]) -> Dict[str, Any]:
-    """将源数据转换为目标格式"""
-    converted = {}
-    for timestamp_str, record in source_data.get("data", {}).items():
-        # 转换干员列表，星级+1
-        converted_chars = []
-        for char in record.get("c", []):
-            # 确保角色数据格式正确 [name, rarity, isNew]
-            if len(char) >= 3:
-                name, rarity, is_new = char[0], char[1], char[2]
-                # 稀有度转换: 2->3, 3->4, 4->5, 5->6
-                converted_rarity = rarity + 1
-                converted_chars.append([name, converted_rarity, is_new])
-            else:
-                # 如果数据格式不完整，跳过该项
-                print(f"警告: 角色数据不完整，跳过: {char}")
-
-        # 创建新记录
-        converted[timestamp_str] = {
-            "p": record.get("p", ""),
-            "pt": map_pool_type(record.get("p", "")),
-            "c": converted_chars
-        }
-    return converted
 
+    def __init__(self, catalog=None, max_new_pools: Optional[int] = MAX_IMPORT_NEW_POOLS):
+        self.catalog = catalog or get_pool_catalog()
+        self.max_new_pools = max_new_pools
+        self.new_pools = []
 
-def merge_data(existing_data: Dict[str, Any], new_data: Dict[str, Any]) -> Dict[str, Any]:
-    """合并现有数据和新数据，避免重复"""
-    # 使用 existing_data 作为基础
-    merged = existing_data.copy()
+    def pool_type(self, pool_name: str) -> int:
+        """
+        Raises:
+            SizeLimitError: 本次导入登记的新卡池超过限制
+        """
+        if pool_name not in self.catalog.by_name:
+            if self.max_new_pools is not None and len(self.new_pools) >= self.max_new_pools:
+                raise SizeLimitError(f"新卡池数量超过限制 ({self.max_new_pools} 个)")
+            self.new_pools.append(pool_name)
+        return self.catalog.pool_type(pool_name)
 
-    # 遍历新数据
-    for timestamp, record in new_data.items():
-        # 如果时间戳不存在于现有数据中，则添加
-        if timestamp not in merged:
-            merged[timestamp] = record
+    def discard(self):
+        self.catalog.discard(self.new_pools)
+        self.new_pools = []
+
+
+def convert_source_record(record: Dict[str, Any], pool_types: Optional[PoolTypeMapper] = None) -> Dict[str, Any]:
+    """将源数据中的一条记录（一次单抽或十连）转换为存储格式
+
+    不传 pool_types 时不解析卡池类型（结果中没有 "pt"，不访问卡池目录），
+    由调用方之后通过 assign_pool_types 补齐。
+    """
+    # 转换干员列表，星级+1
+    converted_chars = []
+    for char in record.get("c", []):
+        # 确保角色数据格式正确 [name, rarity, isNew]
+        if len(char) >= 3:
+            name, rarity, is_new = char[0], char[1], char[2]
+            # 稀有度转换: 2->3, 3->4, 4->5, 5->6
+            converted_rarity = rarity + 1
+            converted_chars.append([name, converted_rarity, is_new])
         else:
-            # 可选：如果时间戳已存在，可以选择覆盖或者保留原有数据
-            # 这里我们选择保留原有数据，不做覆盖
-            pass
-            
-    return merged
+            # 如果数据格式不完整，跳过该项
+            print(f"警告: 角色数据不完整，跳过: {char}")
 
+    converted = {"p": record.get("p", "")}
+    if pool_types is not None:
+        converted["pt"] = pool_types.pool_type(converted["p"])
+    converted["c"] = converted_chars
+    return converted
+
+
+def assign_pool_types(records: Dict[str, Dict[str, Any]], pool_types: PoolTypeMapper) -> None:
+    """为未解析卡池类型的记录补齐 "pt"
+
+    Raises:
+        SizeLimitError: 新卡池数超过限制
+    """
+    for record in records.values():
+        record["pt"] = pool_types.pool_type(record["p"])
 
 
+def iter_source_records(source_fp: BinaryIO, max_bytes: Optional[int] = MAX_IMPORT_BYTES,
+                        max_records: Optional[int] = MAX_IMPORT_RECORDS,
+                        pool_types: Optional[PoolTypeMapper] = None) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """流式读取源文件 "data" 字段中的记录并逐条转换为存储格式（pool_types 的含义见 convert_source_record）
 
-def import_gacha_data(source_json_path: str, target_json_path: str, output_json_path: str) -> bool:
+    Raises:
+        SizeLimitError: 文件大小、记录数或新卡池数超过限制
+        ValueError: 文件格式错误
     """
-    导入并合并抽卡数据
-    
-    Args:
-        source_json_path: 源JSON文件路径 (例如: 684774691.json)
-        target_json_path: 目标JSON文件路径 (例如: users/Arno/accounts/684774691/data.json)
-        output_json_path: 输出JSON文件路径 (例如: 684774691_converted.json)
-        
+    count = 0
+    for timestamp_str, record in iter_json_object(source_fp, ("data",), max_bytes=max_bytes):
+        count += 1
+        if max_records is not None and count > max_records:
+            raise SizeLimitError(f"记录数超过限制 ({max_records} 条)")
+        if not timestamp_str.isdigit() or not isinstance(record, dict):
+            raise ValueError(f"无效的记录: {timestamp_str}")
+        yield timestamp_str, convert_source_record(record, pool_types)
+
+
+def stream_import_gacha_data(source_fp: BinaryIO, user_uid: str, game_uid: str,
+                             storer: Optional[GachaDataStorer] = None,
+                             max_bytes: Optional[int] = MAX_IMPORT_BYTES,
+                             max_records: Optional[int] = MAX_IMPORT_RECORDS) -> Dict[str, int]:
+    """流式导入第三方导出文件到账号数据
+
+    上传内容逐条解析、转换后直接与流式读取的账号已有数据按时间线性归并，边归并边写出，
+    内存占用与上传大小、历史记录数无关。第三方导出文件只有秒级时间戳，
+    已有数据中同一秒已有记录的视为重复，保留已有记录。
+    流式归并要求记录按时间倒序排列（与 data.json 相同）；顺序不同时，若源文件可以重新读取
+    （上传文件与本地文件均可），重新读取并在内存中排序后导入（受 max_bytes / max_records 限制）。
+
     Returns:
-        bool: 操作是否成功
+        {"total": 源记录数, "imported": 新导入数, "skipped": 重复跳过数, "conflicts": 冲突数}
+
+    Raises:
+        SizeLimitError / ValueError: 源文件超过限制或格式错误
+        IOError: 写入失败
     """
+    storer = storer or GachaDataStorer()
+
+    total = 0
+
+    def counted(items):
+        nonlocal total
+        for item in items:
+            total += 1
+            yield item
+
+    pool_types = PoolTypeMapper()
     try:
-        # 1. 读取源文件 (684774691.json)
-        if not os.path.exists(source_json_path):
-            print(f"错误: 源文件 {source_json_path} 不存在")
-            return False
-            
-        with open(source_json_path, 'r', encoding='utf-8') as f:
-            source_data = json.load(f)
-        
-        # 2. 读取目标文件 (users/Arno/accounts/684774691/data.json)
-        if not os.path.exists(target_json_path):
-            print(f"错误: 目标文件 {target_json_path} 不存在")
-            return False
-            
-        with open(target_json_path, 'r', encoding='utf-8') as f:
-            existing_data = json.load(f)
-        
-        # 3. 转换源数据
-        converted_data = convert_source_data(source_data)
-        
-        # 4. 合并数据
-        merged_data = merge_data(existing_data, converted_data)
-        
-        # 5. 写入新文件 (使用标准的json.dump)
-        with open(output_json_path, 'w', encoding='utf-8') as f:
-            json.dump(merged_data, f, ensure_ascii=False, indent=2)
-        
-        print(f"数据导入和合并完成，结果已保存到 {output_json_path}")
-        return True
-        
-    except Exception as e:
-        print(f"导入过程中发生错误: {e}")
-        return False
+        records = counted(iter_source_records(source_fp, max_bytes, max_records, pool_types))
+        first = next(records, None)
+        if first is None:
+            return {"total": 0, "imported": 0, "skipped": 0, "conflicts": 0}
+        try:
+            merge = storer.save_record_stream(chain([first], records), user_uid, game_uid,
+                                              prefer=KEEP_EXISTING, precise=False)
+        except NotDescendingError:
+            if not source_fp.seekable():
+                raise ValueError("导入文件中的记录未按时间倒序排列")
+            source_fp.seek(0)
+            total = 0
+            sorted_records = {}
+            for timestamp_str, record in counted(iter_source_records(source_fp, max_bytes, max_records,
+                                                                     pool_types)):
+                sorted_records.setdefault(timestamp_str, record)
+            merge = storer.save_record_stream(sorted_records, user_uid, game_uid,
+                                              prefer=KEEP_EXISTING, precise=False)
+    except Exception:
+        pool_types.discard()
+        raise
+    return {
+        "total": total,
+        "imported": merge.added,
+        "skipped": total - merge.added,
+        "conflicts": len(merge.conflicts)
+    }
+
+
+_UID_IN_FILENAME = re.compile(r"\d{6,}")
+
+
+def detect_export_uid(source_json_path: str) -> Optional[str]:
+    """确定导出文件所属的游戏 UID
+
+    依次尝试：文件名本身为 UID（如 684774691.json）；文件内容顶层的 "uid" 或 "info.uid" 字段；
+    文件名中的一段长数字（如 export_684774691.json）。
+    """
+    stem = os.path.splitext(os.path.basename(source_json_path))[0]
+    if stem.isdigit():
+        return stem
+    with open(source_json_path, 'rb') as f:
+        for key, value in iter_json_object(f):
+            if key == "uid" and value:
+                return str(value)
+            if key == "info" and isinstance(value, dict) and value.get("uid"):
+                return str(value["uid"])
+    match = _UID_IN_FILENAME.search(stem)
+    return match.group(0) if match else None
+
+
+def read_export_file(source_json_path: str, max_records: Optional[int] = None) -> Dict[str, Any]:
+    """流式读取并转换整个导出文件，返回 {时间戳: 记录}（同一时间戳保留首次出现的记录）
+
+    只读取文件，不解析卡池类型、不访问卡池目录（可在子进程中执行）；
+    写入前由调用方通过 assign_pool_types 补齐 "pt"。
+    """
+    records = {}
+    with open(source_json_path, 'rb') as f:
+        for timestamp_str, record in iter_source_records(f, max_bytes=None, max_records=max_records):
+            records.setdefault(timestamp_str, record)
+    return records
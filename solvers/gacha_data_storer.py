@@ -2,15 +2,17 @@ import json
 import os
 from datetime import datetime
 from collections import defaultdict
+from .pool_catalog import get_pool_catalog
+from .operator_catalog import get_operator_catalog
+from user_system.catalog import touch_account, USERS_BASE_PATH
+from .json_stream import iter_json_object
+from .record_merge import (SortedMerge, KeyMigration, descending_items, drop_superseded_legacy, require_descending,
+                           KEEP_NEW, KEY_FORMAT)
 
 class GachaDataStorer:
-    POOL_TYPE_MAPPING = {
-        "normal": 1,
-        "classic": 2,
-    }
-    
-    def __init__(self, config_path="./config/system.json"):
+    def __init__(self, config_path="./config/system.json", users_base_path=USERS_BASE_PATH):
         self.config_path = config_path
+        self.users_base_path = users_base_path
         self.config = self._load_config()
     
     def _load_config(self):
@@ -21,20 +23,21 @@ class GachaDataStorer:
             print(f"加载配置文件时出错: {e}")
             return {}
     
-    def _map_pool_type(self, pool_type_id):
-        """将卡池类型ID映射到整数代码"""
-        # 如果在映射中，使用映射值；否则默认为 0 (限定寻访)
-        return self.POOL_TYPE_MAPPING.get(pool_type_id, 0)
+    def _map_pool_type(self, pool_name, pool_type_id):
+        """通过卡池目录将卡池映射到整数类型代码（目录中没有的卡池按分类ID登记）"""
+        return get_pool_catalog().resolve(pool_name, category=pool_type_id).pool_type
     
     def _write_compact_json(self, data, fp):
         """
         将数据以指定的紧凑格式写入文件对象。
         格式：外层对象有缩进，内层数组元素在同一行。
+        data 可以是字典，也可以是 (时间戳, 记录) 的可迭代对象（例如归并结果）。
         """
-        fp.write('{\n')
-        num_items = len(data)
-        for i, (ts, record) in enumerate(data.items()):
-            fp.write(f'  "{ts}": {{\n')
+        items = data.items() if isinstance(data, dict) else data
+        fp.write('{')
+        separator = '\n'
+        for ts, record in items:
+            fp.write(f'{separator}  "{ts}": {{\n')
             fp.write(f'    "p": {json.dumps(record["p"], ensure_ascii=False)},\n')
             fp.write(f'    "pt": {record["pt"]},\n')
             fp.write(f'    "c": [\n')
@@ -48,28 +51,30 @@ class GachaDataStorer:
                 
             fp.write(f'    ]\n')
             fp.write(f'  }}')
-            if i < num_items - 1:
-                fp.write(',')
-            fp.write('\n')
-        fp.write('}\n')
+            separator = ',\n'
+        fp.write('\n}\n')
     
     def _transform_records_for_saving(self, records):
-        """将原始记录列表转换为新的紧凑JSON格式"""
+        """将原始记录列表转换为新的紧凑JSON格式
+        
+        以官方的 gachaTs（毫秒）为键，同一 gachaTs 的记录（十连）按 pos 排序，
+        c 中的下标即 pos，因此 (gachaTs, pos) 唯一确定一次抽卡。
+        """
         if not records:
             return {}
         
         grouped_data = defaultdict(list)
         
         for record in records:
-            ts_in_seconds = str(int(record["gachaTs"]) // 1000)
-            grouped_data[ts_in_seconds].append(record)
+            grouped_data[str(int(record["gachaTs"]))].append(record)
         
         final_data = {}
         for ts, record_list in grouped_data.items():
+            record_list.sort(key=lambda record: int(record.get("pos", 0)))
             first_record = record_list[0]
             pool_name = first_record.get("poolName", "未知卡池")
-            pool_type_id = first_record.get("poolType", "unknown")
-            pool_type_code = self._map_pool_type(pool_type_id)
+            pool_type_id = first_record.get("poolType")
+            pool_type_code = self._map_pool_type(pool_name, pool_type_id)
             
             chars_data = []
             for record in record_list:
@@ -88,41 +93,134 @@ class GachaDataStorer:
         
         return final_data
     
+    def _account_dir(self, user_uid, game_uid):
+        return os.path.join(self.users_base_path, user_uid or "default_user", "accounts", game_uid)
+    
+    def _read_metadata(self, metadata_file_path):
+        if not os.path.exists(metadata_file_path):
+            return {}
+        try:
+            with open(metadata_file_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except Exception as e:
+            print(f"读取元数据时出错，将重新计算: {e}")
+            return {}
+    
+    def _collect_operators(self, items, owned):
+        """写出记录的同时收集账号拥有的干员（干员名 -> 稀有度），原样产出 items"""
+        for item in items:
+            for char_name, rarity, _ in item[1]["c"]:
+                if char_name not in owned:
+                    owned[char_name] = rarity
+            yield item
+    
+    def _register_owned_operators(self, owned):
+        """登记目录外的干员及其稀有度，供图鉴统计使用，返回排序后的干员名列表
+
+        metadata.json 中保存的是干员名而非位图：干员 ID 只在进程内有效，各进程登记目录外干员的顺序不同。
+        """
+        catalog = get_operator_catalog()
+        for char_name, rarity in owned.items():
+            catalog.operator_id(char_name, rarity)
+        catalog.save()
+        return sorted(owned)
+    
+    def _existing_items(self, data_file_path, key_format):
+        """按时间倒序逐条读取账号现有的 data.json（不整体载入内存）
+
+        已是当前键格式的文件由本类写出，必然倒序，直接流式读取；
+        尚未迁移的旧文件可能由旧版导入工具写出、顺序不定，一次性载入并排序（只在迁移时发生一次）。
+        """
+        if not os.path.exists(data_file_path):
+            return
+        with open(data_file_path, "rb") as f:
+            if key_format == KEY_FORMAT:
+                yield from require_descending(iter_json_object(f))
+            else:
+                yield from descending_items(json.load(f))
+    
+    def _merge_and_write(self, new_data, user_uid, game_uid, prefer=KEEP_NEW, precise=True):
+        """将转换后的记录合并进账号的 data.json 并更新元数据
+        
+        现有数据从文件中流式读取，与按时间倒序的新数据线性归并后逐条写出，
+        内存占用与历史记录数无关。同一记录内容不同时按 prefer 保留一方（默认以新数据为准）。
+        现有文件仍以秒为键时先迁移为毫秒键。
+        
+        Args:
+            new_data: {时间戳: 记录}，或按时间倒序排列的 (时间戳, 记录) 可迭代对象（例如流式解析的导入文件）
+            precise: False 表示新数据只有秒级精度（第三方导出文件），已有数据中同一秒已有记录的不再导入
+        
+        Returns:
+            tuple: (data.json 路径, metadata.json 路径, SortedMerge)
+        
+        Raises:
+            NotDescendingError: new_data 为可迭代对象且没有按时间倒序排列（此时 data.json 不会被修改）
+        """
+        data_dir = self._account_dir(user_uid, game_uid)
+        data_file_path = os.path.join(data_dir, "data.json")
+        metadata_file_path = os.path.join(data_dir, "metadata.json")
+        
+        os.makedirs(data_dir, exist_ok=True)
+        
+        previous_metadata = self._read_metadata(metadata_file_path)
+        new_items = descending_items(new_data) if isinstance(new_data, dict) else require_descending(new_data)
+        if precise:
+            # 官方接口返回的一批记录，需要先取得其覆盖的秒
+            new_items = list(new_items)
+        else:
+            new_items = KeyMigration(new_items)
+        
+        existing_stream = self._existing_items(data_file_path, previous_metadata.get("key_format"))
+        existing = KeyMigration(existing_stream, previous_metadata.get("legacy_until"))
+        existing_items = drop_superseded_legacy(existing, new_items) if precise else existing
+        merge = SortedMerge(existing_items, new_items, prefer=prefer, skip_covered_seconds=not precise)
+        owned = {}
+        # 先写临时文件再替换，正在流式读取旧文件的请求（如导出）不会读到写了一半的数据
+        tmp_file_path = f"{data_file_path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_file_path, "w", encoding="utf-8") as f:
+                self._write_compact_json(self._collect_operators(merge, owned), f)
+            os.replace(tmp_file_path, data_file_path)
+        finally:
+            # 出错时立即关闭现有文件，再删除临时文件
+            existing_stream.close()
+            if os.path.exists(tmp_file_path):
+                os.remove(tmp_file_path)
+        
+        for conflict in merge.conflicts:
+            print(f"记录 {conflict['ts']} 与已有数据不一致，"
+                  f"保留{'新' if prefer == KEEP_NEW else '已有'}数据")
+        
+        legacy_until = existing.legacy_until
+        if not precise and merge.newest_added is not None:
+            legacy_until = max(legacy_until or 0, merge.newest_added)
+        owned_operators = self._register_owned_operators(owned)
+        metadata = {
+            "last_update": datetime.now().isoformat(),
+            "game_uid": game_uid,
+            "record_count": merge.total,
+            "pull_count": merge.pulls,
+            "key_format": KEY_FORMAT,
+            "owned_operators": owned_operators,
+            "owned_count": len(owned_operators)
+        }
+        if legacy_until is not None:
+            metadata["legacy_until"] = legacy_until
+        with open(metadata_file_path, "w", encoding="utf-8") as f:
+            json.dump(metadata, f, ensure_ascii=False, indent=2)
+        # 本次保存中新登记的卡池一次写入
+        get_pool_catalog().save()
+        touch_account(user_uid, game_uid, metadata["last_update"], users_base_path=self.users_base_path,
+                      pull_count=merge.pulls, data_size=os.path.getsize(data_file_path))
+        return data_file_path, metadata_file_path, merge
+    
     def save_gacha_records(self, records, user_uid, game_uid):
         try:
             if not user_uid:
                 user_uid = "default_user"
             
-            data_dir = f"./users/{user_uid}/accounts/{game_uid}"
-            data_file_path = os.path.join(data_dir, "data.json")
-            metadata_file_path = os.path.join(data_dir, "metadata.json")
-            
-            os.makedirs(data_dir, exist_ok=True)
-            
-            # 读取现有数据
-            existing_data = {}
-            if os.path.exists(data_file_path):
-                with open(data_file_path, "r", encoding="utf-8") as f:
-                    existing_data = json.load(f)
-            
             transformed_data = self._transform_records_for_saving(records)
-            
-            # 合并数据
-            existing_data.update(transformed_data)
-            
-            sorted_ts = sorted(existing_data.keys(), key=int, reverse=True)
-            sorted_transformed_data = {ts: existing_data[ts] for ts in sorted_ts}
-
-            with open(data_file_path, "w", encoding="utf-8") as f:
-                self._write_compact_json(sorted_transformed_data, f)
-            
-            metadata = {
-                "last_update": datetime.now().isoformat(),
-                "game_uid": game_uid,
-                "record_count": len(sorted_transformed_data)
-            }
-            with open(metadata_file_path, "w", encoding="utf-8") as f:
-                json.dump(metadata, f, ensure_ascii=False, indent=2)
+            data_file_path, metadata_file_path, _ = self._merge_and_write(transformed_data, user_uid, game_uid)
             
             print(f"已保存 {len(records)} 条寻访记录到 {data_file_path}")
             print(f"已保存元数据到 {metadata_file_path}")
@@ -136,34 +234,8 @@ class GachaDataStorer:
             if not user_uid:
                 user_uid = "default_user"
             
-            data_dir = f"./users/{user_uid}/accounts/{game_uid}"
-            data_file_path = os.path.join(data_dir, "data.json")
-            metadata_file_path = os.path.join(data_dir, "metadata.json")
-            
-            existing_data = {}
-            if os.path.exists(data_file_path):
-                with open(data_file_path, "r", encoding="utf-8") as f:
-                    existing_data = json.load(f)
-            
             new_data = self._transform_records_for_saving(new_records)
-            
-            existing_data.update(new_data)
-            
-            sorted_ts = sorted(existing_data.keys(), key=int, reverse=True)
-            sorted_existing_data = {ts: existing_data[ts] for ts in sorted_ts}
-            
-            os.makedirs(data_dir, exist_ok=True)
-            
-            with open(data_file_path, "w", encoding="utf-8") as f:
-                self._write_compact_json(sorted_existing_data, f)
-            
-            metadata = {
-                "last_update": datetime.now().isoformat(),
-                "game_uid": game_uid,
-                "record_count": len(sorted_existing_data)
-            }
-            with open(metadata_file_path, "w", encoding="utf-8") as f:
-                json.dump(metadata, f, ensure_ascii=False, indent=2)
+            data_file_path, metadata_file_path, _ = self._merge_and_write(new_data, user_uid, game_uid)
             
             print(f"已增量保存 {len(new_records)} 条新寻访记录到 {data_file_path}")
             print(f"已更新元数据到 {metadata_file_path}")
@@ -172,13 +244,68 @@ class GachaDataStorer:
             print(f"增量保存寻访记录时出错: {e}")
             return False
     
+    def save_converted_records(self, converted_data, user_uid, game_uid, prefer=KEEP_NEW, precise=True):
+        """保存已经是存储格式 ({时间戳: {"p", "pt", "c"}}) 的记录，例如从第三方导出文件导入的数据
+        
+        第三方导出文件以秒为键，需传入 precise=False。
+        
+        Returns:
+            SortedMerge: 成功时返回归并统计（新增、重复、冲突）；失败时返回 None
+        """
+        try:
+            if not user_uid:
+                user_uid = "default_user"
+            
+            data_file_path, _, merge = self._merge_and_write(converted_data, user_uid, game_uid, prefer, precise)
+            
+            print(f"已导入 {merge.added} 条寻访记录到 {data_file_path}")
+            return merge
+        except Exception as e:
+            print(f"导入寻访记录时出错: {e}")
+            return None
+    
+    def save_record_stream(self, items, user_uid, game_uid, prefer=KEEP_NEW, precise=True):
+        """流式保存按时间倒序排列的存储格式记录 ((时间戳, 记录) 流，例如边解析边导入的上传文件)
+        
+        与 save_converted_records 不同，解析与写入中的错误直接抛出，由调用方处理；出错时 data.json 不会被修改。
+        
+        Returns:
+            SortedMerge: 归并统计（新增、重复、冲突）
+        
+        Raises:
+            NotDescendingError: 记录没有按时间倒序排列
+            SizeLimitError / ValueError: 输入超过限制或格式错误
+        """
+        data_file_path, _, merge = self._merge_and_write(items, user_uid or "default_user", game_uid,
+                                                         prefer, precise)
+        print(f"已导入 {merge.added} 条寻访记录到 {data_file_path}")
+        return merge
+    
+    def migrate_account_data(self, user_uid, game_uid):
+        """将账号的 data.json 从秒级键升级为毫秒键（已是新格式时不做改动）"""
+        try:
+            if not user_uid:
+                user_uid = "default_user"
+            
+            data_dir = self._account_dir(user_uid, game_uid)
+            if not os.path.exists(os.path.join(data_dir, "data.json")):
+                return False
+            if self._read_metadata(os.path.join(data_dir, "metadata.json")).get("key_format") == KEY_FORMAT:
+                return True
+            data_file_path, _, merge = self._merge_and_write({}, user_uid, game_uid)
+            print(f"已迁移 {merge.total} 条寻访记录: {data_file_path}")
+            return True
+        except Exception as e:
+            print(f"迁移寻访记录时出错: {e}")
+            return False
+    
     def load_gacha_data(self, user_uid, game_uid):
         """加载寻访数据文件 (data.json)"""
         try:
             if not user_uid:
                 user_uid = "default_user"
             
-            data_file_path = f"./users/{user_uid}/accounts/{game_uid}/data.json"
+            data_file_path = os.path.join(self._account_dir(user_uid, game_uid), "data.json")
             
             if not os.path.exists(data_file_path):
                 print(f"数据文件不存在: {data_file_path}")
@@ -198,7 +325,7 @@ class GachaDataStorer:
             if not user_uid:
                 user_uid = "default_user"
             
-            metadata_file_path = f"./users/{user_uid}/accounts/{game_uid}/metadata.json"
+            metadata_file_path = os.path.join(self._account_dir(user_uid, game_uid), "metadata.json")
             
             if not os.path.exists(metadata_file_path):
                 print(f"元数据文件不存在: {metadata_file_path}")
@@ -0,0 +1,122 @@
+import codecs
+import json
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+
+class SizeLimitError(ValueError):
+    """输入超过允许的大小"""
+
+
+class _JsonStream:
+    """按块读取二进制 JSON 流的最小解析器，只在内存中保留当前块与正在解析的值"""
+
+    def __init__(self, fp, chunk_size=DEFAULT_CHUNK_SIZE, max_bytes=None):
+        self.fp = fp
+        self.chunk_size = chunk_size
+        self.max_bytes = max_bytes
+        self.bytes_read = 0
+        self.decoder = json.JSONDecoder()
+        # utf-8-sig 同时兼容带 BOM 的文件
+        self.text_decoder = codecs.getincrementaldecoder('utf-8-sig')()
+        self.buf = ''
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self):
+        """读取下一块数据，已到达文件末尾时返回 False"""
+        if self.eof:
+            return False
+        data = self.fp.read(self.chunk_size)
+        self.bytes_read += len(data)
+        if self.max_bytes is not None and self.bytes_read > self.max_bytes:
+            raise SizeLimitError(f"文件超过大小限制 ({self.max_bytes} 字节)")
+        if self.pos:
+            self.buf = self.buf[self.pos:]
+            self.pos = 0
+        if not data:
+            self.eof = True
+            self.buf += self.text_decoder.decode(b'', final=True)
+            return False
+        self.buf += self.text_decoder.decode(data)
+        return True
+
+    def peek(self):
+        """跳过空白并返回下一个字符，文件结束时返回空字符串"""
+        while True:
+            length = len(self.buf)
+            while self.pos < length and self.buf[self.pos] in ' \t\r\n':
+                self.pos += 1
+            if self.pos < length:
+                return self.buf[self.pos]
+            if not self._fill():
+                return ''
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise ValueError(f"JSON 格式错误: 第 {self.bytes_read} 字节附近应为 {char!r}")
+        self.pos += 1
+
+    def value(self):
+        """解析下一个完整的 JSON 值；值跨越块边界时继续读取后重试
+
+        每次重试前让未解析部分至少翻倍，大值（例如整个 "data" 对象）的解析总量保持线性。
+        """
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buf, self.pos)
+                # 值恰好结束于缓冲区末尾时（如数字）可能尚未完整，需要再读一块确认
+                if end < len(self.buf) or self.eof:
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            target = 2 * (len(self.buf) - self.pos)
+            while self._fill() and len(self.buf) - self.pos < target:
+                pass
+
+    def keys(self):
+        """遍历当前对象的键；调用方需在取得每个键后消费其对应的值"""
+        self.expect('{')
+        if self.peek() == '}':
+            self.pos += 1
+            return
+        while True:
+            key = self.value()
+            if not isinstance(key, str):
+                raise ValueError("JSON 格式错误: 对象的键必须是字符串")
+            self.expect(':')
+            yield key
+            separator = self.peek()
+            self.pos += 1
+            if separator == '}':
+                return
+            if separator != ',':
+                raise ValueError(f"JSON 格式错误: 第 {self.bytes_read} 字节附近缺少 ',' 或 '}}'")
+
+
+def _iter_path(stream, path):
+    for key in stream.keys():
+        if not path:
+            yield key, stream.value()
+        elif key == path[0]:
+            if stream.peek() != '{':
+                raise ValueError(f"JSON 格式错误: 字段 {key!r} 应为对象")
+            yield from _iter_path(stream, path[1:])
+        else:
+            stream.value()
+
+
+def iter_json_object(fp, path=(), chunk_size=DEFAULT_CHUNK_SIZE, max_bytes=None):
+    """流式遍历 JSON 文件中某个对象的 (键, 值)，内存占用与文件大小无关
+
+    Args:
+        fp: 以二进制模式打开的文件对象
+        path: 目标对象所在的键路径，例如 ("data",) 表示顶层对象的 "data" 字段；
+              为空时遍历顶层对象
+        max_bytes: 允许读取的最大字节数，超过时抛出 SizeLimitError
+    """
+    stream = _JsonStream(fp, chunk_size, max_bytes)
+    yield from _iter_path(stream, tuple(path))
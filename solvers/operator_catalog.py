@@ -0,0 +1,175 @@
+import sys
+import threading
+from .file_lock import file_lock, file_mtime, read_json, atomic_write_json
+
+DEFAULT_CATALOG_PATH = "./config/operator_catalog.json"
+# 运行时遇到的目录外干员登记在 users 下的未纳入版本控制的文件中，不修改随代码发布的目录文件
+DISCOVERED_OPERATORS_PATH = "./users/.operator_catalog.json"
+
+UNKNOWN = "未知"
+
+
+class OperatorCatalog:
+    """干员目录：干员名 -> 整数 ID，以及职业、阵营、稀有度
+
+    职业与阵营同样编码为小整数，统计时可以直接用 ID 数组做 bincount 聚合。
+    config/operator_catalog.json 随代码发布，只读，前 curated 个 ID 即其中的干员；
+    目录中没有的干员在首次出现时追加到末尾并分配新的 ID，职业与阵营记为“未知”，
+    调用 save() 后写入 discovered_path（在跨进程文件锁内与其他进程登记的干员合并）。
+    进程内的 ID 只追加不重排，其他进程登记的干员由 refresh() 追加到末尾。
+    各进程登记干员的顺序不同，ID 与位图只在进程内使用，持久化时保存干员名。
+    """
+
+    def __init__(self, catalog_path=DEFAULT_CATALOG_PATH, discovered_path=DISCOVERED_OPERATORS_PATH):
+        self.catalog_path = catalog_path
+        self.discovered_path = discovered_path
+        self.discovered_mtime = None
+        self.ids = {}
+        self.names = []
+        self.rarities = []
+        # 职业 / 阵营编码表：名称列表与 名称 -> 编码
+        self.class_names = [UNKNOWN]
+        self.faction_names = [UNKNOWN]
+        self._class_codes = {UNKNOWN: 0}
+        self._faction_codes = {UNKNOWN: 0}
+        self.class_of = []
+        self.faction_of = []
+        # 新登记或补充了稀有度、尚未写入 discovered_path 的干员：名称 -> 稀有度
+        self._pending = {}
+        self._lock = threading.RLock()
+        self._load()
+        self.curated = len(self.names)
+        self.refresh()
+
+    def _load(self):
+        catalog = read_json(self.catalog_path)
+        for class_name in catalog.get("classes", []):
+            self._code(self._class_codes, self.class_names, class_name)
+        for item in catalog.get("operators", []):
+            self._add(item["name"], item.get("class"), item.get("faction"), item.get("rarity") or 0)
+
+    def _merge_discovered(self, operators):
+        for item in operators:
+            operator_id = self.ids.get(item["name"])
+            if operator_id is None:
+                self._add(item["name"], rarity=item.get("rarity") or 0)
+            elif item.get("rarity") and not self.rarities[operator_id]:
+                self.rarities[operator_id] = item["rarity"]
+
+    def refresh(self):
+        """追加其他进程登记的干员（discovered_path 未变化时跳过）"""
+        mtime = file_mtime(self.discovered_path)
+        if mtime is None or mtime == self.discovered_mtime:
+            return
+        with self._lock:
+            self._merge_discovered(read_json(self.discovered_path).get("operators", []))
+            self.discovered_mtime = mtime
+
+    @staticmethod
+    def _code(codes, names, value):
+        value = value or UNKNOWN
+        code = codes.get(value)
+        if code is None:
+            code = codes[value] = len(names)
+            names.append(value)
+        return code
+
+    def _add(self, name, class_name=None, faction=None, rarity=0):
+        operator_id = len(self.names)
+        name = sys.intern(name)
+        self.ids[name] = operator_id
+        self.names.append(name)
+        self.rarities.append(rarity)
+        self.class_of.append(self._code(self._class_codes, self.class_names, class_name))
+        self.faction_of.append(self._code(self._faction_codes, self.faction_names, faction))
+        return operator_id
+
+    def operator_id(self, name, rarity=0):
+        """返回干员 ID，目录中没有时登记为未知干员（已知稀有度时一并记录）"""
+        operator_id = self.ids.get(name)
+        if operator_id is None:
+            with self._lock:
+                operator_id = self.ids.get(name)
+                if operator_id is None:
+                    operator_id = self._add(name, rarity=rarity)
+                    self._pending[name] = rarity
+        elif rarity and not self.rarities[operator_id]:
+            with self._lock:
+                self.rarities[operator_id] = rarity
+                self._pending[name] = rarity
+        return operator_id
+
+    def bitset(self, names):
+        """将干员名集合编码为位图（整数，第 ID 位表示拥有该干员）"""
+        bits = 0
+        for name in set(names):
+            bits |= 1 << self.operator_id(name)
+        return bits
+
+    def names_in(self, bits):
+        """解码位图，返回干员名列表（按 ID 顺序）"""
+        names = []
+        operator_id = 0
+        while bits:
+            if bits & 1:
+                names.append(self.names[operator_id])
+            bits >>= 1
+            operator_id += 1
+        return names
+
+    def rarity_mask(self, rarity):
+        """目录中指定稀有度的全部干员的位图"""
+        bits = 0
+        for operator_id, operator_rarity in enumerate(self.rarities):
+            if operator_rarity == rarity:
+                bits |= 1 << operator_id
+        return bits
+
+    def curated_mask(self):
+        """随代码发布的目录中全部干员的位图"""
+        return (1 << self.curated) - 1
+
+    def save(self):
+        """将新登记的干员写入 discovered_path（在文件锁内重新读取后合并）"""
+        if not self._pending:
+            return True
+        with self._lock:
+            try:
+                with file_lock(self.discovered_path):
+                    operators = read_json(self.discovered_path).get("operators", [])
+                    self._merge_discovered(operators)
+                    rarities = {item["name"]: item.get("rarity") or 0 for item in operators}
+                    for name, rarity in self._pending.items():
+                        rarities[name] = rarity or rarities.get(name, 0)
+                    atomic_write_json(self.discovered_path,
+                                      {"operators": [{"name": name, "rarity": rarity}
+                                                     for name, rarity in rarities.items()]}, indent=2)
+                    self.discovered_mtime = file_mtime(self.discovered_path)
+            except Exception as e:
+                print(f"保存干员目录时出错: {e}")
+                return False
+            self._pending = {}
+        return True
+
+
+_catalog = None
+_catalog_lock = threading.Lock()
+
+
+def get_operator_catalog():
+    """返回进程内共享的干员目录，首次使用时加载
+
+    其他进程（如定时更新任务）登记的干员会追加到进程内目录的末尾，已分配的 ID 保持不变。
+    """
+    global _catalog
+    if _catalog is None:
+        with _catalog_lock:
+            if _catalog is None:
+                _catalog = OperatorCatalog()
+    _catalog.refresh()
+    return _catalog
+
+
+def popcount(bits):
+    """位图中置位的数量"""
+    return bin(bits).count("1")
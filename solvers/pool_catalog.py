@@ -0,0 +1,220 @@
+import sys
+import threading
+from .file_lock import file_lock, file_mtime, read_json, atomic_write_json
+
+DEFAULT_CATALOG_PATH = "./config/pool_catalog.json"
+# 运行时发现的卡池登记在 users 下的未纳入版本控制的文件中，不修改随代码发布的目录文件
+DISCOVERED_POOLS_PATH = "./users/.pool_catalog.json"
+# 运行时登记的卡池从这个 ID 开始编号，不会与随代码发布的卡池 ID 冲突
+DISCOVERED_ID_BASE = 10000
+
+# 卡池类型代码
+LIMITED = 0
+STANDARD = 1
+JOINT_OP = 2
+
+FAMILY_NAMES = {STANDARD: "standard", JOINT_OP: "joint_op"}
+
+# 卡池类型的来源：随代码发布的目录、官方接口的卡池分类、卡池名规则（或已保存数据中的 pt）
+SOURCE_CONFIG = "config"
+SOURCE_CATEGORY = "category"
+SOURCE_RULE = "rule"
+
+
+class PoolInfo:
+    """卡池目录中的一项"""
+    __slots__ = ('id', 'name', 'pool_type', 'family', 'source')
+
+    def __init__(self, pool_id, name, pool_type, family=None, source=SOURCE_RULE):
+        self.id = pool_id
+        self.name = sys.intern(name)
+        self.source = source
+        self.set_type(pool_type, family)
+
+    def set_type(self, pool_type, family=None):
+        self.pool_type = pool_type
+        # 保底家族：标准池、中坚池各自共享；每个限定池单独成为一个家族（以卡池名区分，与 ID 无关）
+        self.family = family or FAMILY_NAMES.get(pool_type, f"limited:{self.name}")
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "name": self.name,
+            "type": self.pool_type,
+            "family": self.family
+        }
+
+
+class PoolCatalog:
+    """卡池目录：卡池名 -> 卡池 ID、类型与保底家族
+
+    所有卡池分类都通过一次字典查找完成；目录中没有的卡池按接口分类 ID 或
+    卡池名规则判定类型后登记为新卡池，并分配一个新的整数 ID。
+    官方接口的卡池分类是权威来源：按卡池名规则登记的卡池之后遇到接口分类时，以分类修正其类型。
+
+    config/pool_catalog.json 随代码发布，只读；运行时登记的卡池先记在内存中，
+    调用 save() 时（每次导入或加载一次）写入 discovered_path。登记后到保存前卡池使用
+    进程内的临时负数 ID；保存时在文件锁 (file_lock) 内重新读取该文件，其他进程已登记的
+    同名卡池沿用其 ID，其余分配正式 ID，因此同一卡池在所有进程中 ID 相同
+    （临时 ID 在进程内仍可查到该卡池）。
+    """
+
+    def __init__(self, catalog_path=DEFAULT_CATALOG_PATH, discovered_path=DISCOVERED_POOLS_PATH):
+        self.catalog_path = catalog_path
+        self.discovered_path = discovered_path
+        self.categories = {}
+        self.name_rules = []
+        self.by_name = {}
+        self.by_id = {}
+        self.discovered_mtime = None
+        # 新登记或被接口分类修正、尚未写入 discovered_path 的卡池：卡池名 -> PoolInfo
+        self._pending = {}
+        self._next_pending_id = -1
+        self._lock = threading.RLock()
+        self._load()
+        self._load_discovered()
+
+    def _load(self):
+        catalog = read_json(self.catalog_path)
+        self.categories = catalog.get("categories", {})
+        self.name_rules = [(rule["contains"], rule["type"]) for rule in catalog.get("name_rules", [])]
+        for item in catalog.get("pools", []):
+            self._add(PoolInfo(item["id"], item["name"], item["type"], item.get("family"), SOURCE_CONFIG))
+
+    def _load_discovered(self):
+        """读取运行时登记的卡池（文件未变化时跳过）"""
+        mtime = file_mtime(self.discovered_path)
+        if mtime is None or mtime == self.discovered_mtime:
+            return
+        pools = read_json(self.discovered_path).get("pools", [])
+        for item in pools:
+            info = self.by_name.get(item["name"])
+            source = item.get("source", SOURCE_RULE)
+            if info is None:
+                self._add(PoolInfo(item["id"], item["name"], item["type"], source=source))
+            elif info.id < 0:
+                # 本进程尚未保存的同名卡池：沿用其他进程分配的 ID
+                info.id = item["id"]
+                self.by_id[info.id] = info
+                if info.source == SOURCE_CATEGORY and source != SOURCE_CATEGORY:
+                    continue  # 保留本进程按接口分类得到的类型，保存时写入
+                self._pending.pop(info.name, None)
+                info.source = source
+                info.set_type(item["type"])
+            elif source == SOURCE_CATEGORY and info.source == SOURCE_RULE:
+                # 其他进程已按接口分类修正了类型
+                self._pending.pop(info.name, None)
+                info.source = source
+                info.set_type(item["type"])
+        self.discovered_mtime = mtime
+
+    def refresh(self):
+        """读取其他进程新登记或修正的卡池（文件未变化时只需一次 stat）"""
+        if file_mtime(self.discovered_path) != self.discovered_mtime:
+            with self._lock:
+                self._load_discovered()
+
+    def _add(self, info):
+        self.by_name[info.name] = info
+        self.by_id[info.id] = info
+
+    def classify(self, pool_name, category=None):
+        """判定目录中不存在的卡池的类型：优先使用接口分类 ID，其次按卡池名规则"""
+        if category is not None:
+            return self.categories.get(category, LIMITED)
+        for keyword, pool_type in self.name_rules:
+            if keyword in pool_name:
+                return pool_type
+        return LIMITED
+
+    @staticmethod
+    def _needs_update(info, category):
+        return info is None or (category is not None and info.source == SOURCE_RULE)
+
+    def resolve(self, pool_name, category=None, pool_type=None):
+        """查找卡池，不存在时登记（需调用 save() 持久化）
+
+        给出 category 且目录中的类型只来自卡池名规则时，以接口分类修正该卡池的类型。
+
+        Args:
+            pool_name: 卡池名
+            category: 官方接口返回的卡池分类 ID（如 "normal"、"classic"）
+            pool_type: 已知的卡池类型代码（例如读取已保存的数据时）
+        """
+        info = self.by_name.get(pool_name)
+        if not self._needs_update(info, category):
+            return info
+        with self._lock:
+            # 其他进程可能已经登记或修正了这个卡池
+            self._load_discovered()
+            info = self.by_name.get(pool_name)
+            if info is None:
+                source = SOURCE_RULE if category is None else SOURCE_CATEGORY
+                if pool_type is None or category is not None:
+                    pool_type = self.classify(pool_name, category)
+                info = PoolInfo(self._next_pending_id, pool_name, pool_type, source=source)
+                self._next_pending_id -= 1
+                self._add(info)
+                self._pending[pool_name] = info
+            elif self._needs_update(info, category):
+                info.source = SOURCE_CATEGORY
+                info.set_type(self.classify(pool_name, category))
+                self._pending[pool_name] = info
+        return info
+
+    def pool_type(self, pool_name, category=None):
+        return self.resolve(pool_name, category).pool_type
+
+    def get(self, pool_id):
+        return self.by_id.get(pool_id)
+
+    def discard(self, pool_names):
+        """撤销尚未保存的新卡池（例如导入失败时），已保存或已被其他进程登记的卡池不受影响"""
+        with self._lock:
+            for pool_name in pool_names:
+                info = self._pending.get(pool_name)
+                if info is not None and info.id < 0:
+                    del self._pending[pool_name]
+                    del self.by_name[pool_name]
+                    del self.by_id[info.id]
+
+    def save(self):
+        """将新登记或被修正的卡池写入 discovered_path（在文件锁内重新读取后合并）"""
+        if not self._pending:
+            return True
+        with self._lock:
+            try:
+                with file_lock(self.discovered_path):
+                    self.discovered_mtime = None
+                    self._load_discovered()
+                    next_id = max(DISCOVERED_ID_BASE - 1, max(self.by_id, default=0)) + 1
+                    for info in self._pending.values():
+                        if info.id < 0:
+                            info.id = next_id
+                            self.by_id[next_id] = info
+                            next_id += 1
+                    pools = [{"id": info.id, "name": info.name, "type": info.pool_type, "source": info.source}
+                             for info in sorted(self.by_name.values(), key=lambda info: info.id)
+                             if info.source != SOURCE_CONFIG]
+                    atomic_write_json(self.discovered_path, {"pools": pools}, indent=2)
+                    self.discovered_mtime = file_mtime(self.discovered_path)
+            except Exception as e:
+                print(f"保存卡池目录时出错: {e}")
+                return False
+            self._pending = {}
+        return True
+
+
+_catalog = None
+_catalog_lock = threading.Lock()
+
+
+def get_pool_catalog():
+    """返回进程内共享的卡池目录，首次调用时加载，之后合并其他进程登记或修正的卡池"""
+    global _catalog
+    if _catalog is None:
+        with _catalog_lock:
+            if _catalog is None:
+                _catalog = PoolCatalog()
+    _catalog.refresh()
+    return _catalog
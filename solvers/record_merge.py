@@ -0,0 +1,207 @@
+from itertools import chain
+
+# 同一时间戳上新旧记录不一致时保留哪一方
+KEEP_NEW = "new"
+KEEP_EXISTING = "existing"
+
+# 记录键格式：官方接口的 gachaTs（毫秒）。旧文件以秒为键（10 位数字）
+KEY_FORMAT = "gacha_ts_ms"
+SECOND_KEY_DIGITS = 10
+
+
+def record_key(ts):
+    """记录的排序键（毫秒）；兼容尚未迁移的秒级键"""
+    if len(ts) <= SECOND_KEY_DIGITS:
+        return int(ts) * 1000
+    return int(ts)
+
+
+def record_seconds(ts):
+    """记录键对应的秒级时间戳"""
+    return record_key(ts) // 1000
+
+
+def descending_items(data, key=record_key):
+    """以按时间倒序的 (时间戳, 记录) 列表返回 data
+
+    存储格式的文件本身就是倒序写入的，这里只做一次 O(n) 检查，
+    只有顺序不对（例如旧版导入工具写出的文件）时才排序。
+    """
+    items = list(data.items())
+    previous = None
+    for ts, _ in items:
+        current = key(ts)
+        if previous is not None and current >= previous:
+            return sorted(items, key=lambda item: key(item[0]), reverse=True)
+        previous = current
+    return items
+
+
+class NotDescendingError(ValueError):
+    """流式归并的输入没有按时间倒序排列"""
+
+
+def require_descending(items, key=record_key):
+    """逐条检查 items 按时间严格倒序（descending_items 的流式版本，不满足时抛出 NotDescendingError）"""
+    previous = None
+    for item in items:
+        current = key(item[0])
+        if previous is not None and current >= previous:
+            raise NotDescendingError(f"记录 {item[0]} 未按时间倒序排列")
+        previous = current
+        yield item
+
+
+class KeyMigration:
+    """将秒级键的记录流迁移为毫秒键（迭代时逐条改写）
+
+    旧格式按秒分桶，无法还原出毫秒与抽卡位置，迁移后的键为 秒 * 1000；
+    legacy_until 是迁移记录的最大键，之后从官方接口获取的精确记录
+    可以据此识别并替换同一秒的旧记录（见 drop_superseded_legacy）。
+    输入为倒序时，第一条迁移的记录即确定 legacy_until，之后产出的记录都已按最终值判断。
+    """
+
+    def __init__(self, items, legacy_until=None):
+        self.items = items
+        self.legacy_until = legacy_until
+
+    def __iter__(self):
+        for ts, record in self.items:
+            if len(ts) <= SECOND_KEY_DIGITS:
+                key = int(ts) * 1000
+                if self.legacy_until is None or key > self.legacy_until:
+                    self.legacy_until = key
+                ts = str(key)
+            yield ts, record
+
+
+def _is_legacy(key, legacy_until):
+    return legacy_until is not None and key <= legacy_until and key % 1000 == 0
+
+
+def drop_superseded_legacy(existing, incoming_items):
+    """官方接口的精确记录取代已有数据中同一秒的秒级旧记录
+
+    existing 为已有记录的 KeyMigration（倒序，逐条过滤，不载入内存）；
+    incoming_items 为官方接口返回的一批记录。第三方导出文件只有秒级精度，
+    其重复判断由 SortedMerge(skip_covered_seconds=True) 在归并时完成。
+    """
+    covered = {record_key(ts) // 1000 for ts, _ in incoming_items}
+    for item in existing:
+        key = record_key(item[0])
+        if not (key // 1000 in covered and _is_legacy(key, existing.legacy_until)):
+            yield item
+
+
+class SortedMerge:
+    """对两个按时间倒序排列的记录流做一次线性归并 (O(n + m))
+
+    迭代得到合并后的 (时间戳, 记录)，仍为倒序，可直接交给写入函数，
+    不需要复制现有数据或重新排序。记录的主键为 (gachaTs, pos)：
+    同一 gachaTs 两边都有记录时按位置逐条合并，只补充缺少的位置；
+    同一位置干员不同计为冲突，按 prefer 决定保留哪一方，冲突明细记录在 conflicts 中。
+    skip_covered_seconds 用于只有秒级精度的新记录（第三方导出文件）：已有数据中
+    同一秒已有记录的新记录直接跳过。统计数据在迭代结束后有效，
+    newest_added 为新增记录中最大的键。
+    """
+
+    def __init__(self, existing, incoming, prefer=KEEP_NEW, key=record_key, skip_covered_seconds=False):
+        self.existing = existing
+        self.incoming = incoming
+        self.prefer = prefer
+        self.key = key
+        self.skip_covered_seconds = skip_covered_seconds
+        self.total = 0
+        self.pulls = 0
+        self.added = 0
+        self.replaced = 0
+        self.duplicates = 0
+        self.skipped = 0
+        self.newest_added = None
+        self.conflicts = []
+
+    def __iter__(self):
+        key = self.key
+        existing = iter(self.existing)
+        incoming = iter(self.incoming)
+        skip = self.skip_covered_seconds
+        old = next(existing, None)
+        new = next(incoming, None)
+        # 最近输出的已有记录所在的秒：同一秒的已有记录可能在新记录之前或之后
+        last_old_second = None
+        while old is not None and new is not None:
+            old_key, new_key = key(old[0]), key(new[0])
+            if old_key > new_key:
+                item, old = old, next(existing, None)
+                last_old_second = old_key // 1000
+            elif skip and new_key // 1000 in (old_key // 1000, last_old_second):
+                new = next(incoming, None)
+                self.skipped += 1
+                continue
+            elif new_key > old_key:
+                item, new = new, next(incoming, None)
+                self._count_added(new_key)
+            else:
+                item = self._resolve(old, new)
+                old, new = next(existing, None), next(incoming, None)
+            self.total += 1
+            self.pulls += len(item[1]["c"])
+            yield item
+
+        for item in chain([old] if old is not None else [], existing):
+            self.total += 1
+            self.pulls += len(item[1]["c"])
+            yield item
+        for item in chain([new] if new is not None else [], incoming):
+            new_key = key(item[0])
+            if skip and new_key // 1000 == last_old_second:
+                self.skipped += 1
+                continue
+            self.total += 1
+            self.pulls += len(item[1]["c"])
+            self._count_added(new_key)
+            yield item
+
+    def _count_added(self, new_key):
+        self.added += 1
+        if self.newest_added is None:
+            self.newest_added = new_key
+
+    def _resolve(self, old, new):
+        """合并同一 gachaTs 的两条记录：c 中的下标即抽卡位置 (pos)，按位置逐一合并"""
+        ts, old_record = old
+        new_record = new[1]
+        if old_record == new_record:
+            self.duplicates += 1
+            return old
+        keep_new = self.prefer == KEEP_NEW
+        old_chars, new_chars = old_record["c"], new_record["c"]
+        chars = list(old_chars)
+        conflict = False
+        for pos, char in enumerate(new_chars):
+            if pos >= len(chars):
+                chars.append(char)
+            elif chars[pos] != char:
+                conflict = True
+                if keep_new:
+                    chars[pos] = char
+        if conflict:
+            self.conflicts.append({"ts": ts, "existing": old_record, "incoming": new_record})
+        base = new_record if keep_new else old_record
+        merged = {"p": base["p"], "pt": base["pt"], "c": chars}
+        if merged == old_record:
+            self.duplicates += 1
+            return old
+        self.replaced += 1
+        return ts, merged
+
+    def summary(self):
+        return {
+            "total": self.total,
+            "pulls": self.pulls,
+            "added": self.added,
+            "replaced": self.replaced,
+            "duplicates": self.duplicates,
+            "skipped": self.skipped,
+            "conflicts": len(self.conflicts)
+        }
@@ -2,24 +2,61 @@ from flask import Blueprint, request, render_template, redirect, url_for, flash,
 from flask_login import login_required, current_user
 from user_system.models import User
 from user_system.middleware import admin_required
+from user_system.catalog import get_user_catalog, USER_SORT_FIELDS
 import json
 
+# 用户列表每页默认条数与上限
+USERS_PER_PAGE = 50
+MAX_USERS_PER_PAGE = 200
+
 # 创建管理员蓝图
 admin_bp = Blueprint('admin', __name__, url_prefix='/admin')
 
+def _listing_params():
+    """读取用户列表的分页、排序与搜索参数，参数无效时抛出 ValueError"""
+    sort = request.args.get('sort', 'username')
+    order = request.args.get('order', 'asc')
+    if sort not in USER_SORT_FIELDS:
+        raise ValueError(f'Unsupported sort: {sort}')
+    if order not in ('asc', 'desc'):
+        raise ValueError(f'Unsupported order: {order}')
+    page = max(request.args.get('page', 1, type=int), 1)
+    per_page = min(max(request.args.get('per_page', USERS_PER_PAGE, type=int), 1), MAX_USERS_PER_PAGE)
+    return {
+        'page': page,
+        'per_page': per_page,
+        'sort': sort,
+        'order': order,
+        'q': request.args.get('q', '').strip()
+    }
+
+def _list_user_page(params):
+    """按参数从用户目录索引中取出一页用户，返回 (用户列表, 总数, 总页数)"""
+    users, total = get_user_catalog().list_users(
+        sort=params['sort'], descending=params['order'] == 'desc', query=params['q'],
+        offset=(params['page'] - 1) * params['per_page'], limit=params['per_page'])
+    pages = max((total + params['per_page'] - 1) // params['per_page'], 1)
+    return users, total, pages
+
 @admin_bp.route('/')
 @admin_required
 def dashboard():
-    """管理员控制台"""
-    users = User.get_all_users()
-    return render_template('admin/dashboard.html', users=users)
+    """管理员控制台（汇总数据来自用户目录索引）"""
+    catalog = get_user_catalog()
+    recent_users, _ = catalog.list_users(sort='last_update', descending=True, limit=5)
+    return render_template('admin/dashboard.html', summary=catalog.summary(), users=recent_users)
 
 @admin_bp.route('/users')
 @admin_required
 def list_users():
-    """用户列表"""
-    users = User.get_all_users()
-    return render_template('admin/users.html', users=users)
+    """用户列表（服务端分页与排序）"""
+    try:
+        params = _listing_params()
+    except ValueError as e:
+        flash(str(e), 'error')
+        return redirect(url_for('admin.list_users'))
+    users, total, pages = _list_user_page(params)
+    return render_template('admin/users.html', users=users, total=total, pages=pages, **params)
 
 @admin_bp.route('/reset_password/<username>', methods=['POST'])
 @admin_required
@@ -111,19 +148,23 @@ def create_admin():
 @admin_bp.route('/api/users')
 @admin_required
 def api_users():
-    """获取用户列表API"""
-    users = User.get_all_users()
-    user_list = []
-    for user in users:
-        user_list.append({
-            'username': user.username,
-            'is_admin': user.is_admin,
-            'force_password_change': user.force_password_change
-        })
+    """获取用户列表API（分页、排序，数据直接来自用户目录索引）
+
+    参数：page、per_page（最大 200）、sort（username/account_count/pull_count/data_size/last_update）、
+    order（asc/desc）、q（用户名搜索）
+    """
+    try:
+        params = _listing_params()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    users, total, pages = _list_user_page(params)
     
     return jsonify({
-        'users': user_list,
-        'total': len(user_list)
+        'users': users,
+        'total': total,
+        'page': params['page'],
+        'per_page': params['per_page'],
+        'pages': pages
     })
 
 @admin_bp.route('/api/user/<username>')
@@ -0,0 +1,315 @@
+import os
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from solvers.json_stream import iter_json_object
+from solvers.file_lock import file_lock, file_mtime, read_json, atomic_write_json
+
+USERS_BASE_PATH = "users"
+DEFAULT_CATALOG_DIR = os.path.join(USERS_BASE_PATH, ".catalog")
+CATALOG_VERSION = 3
+# 目录根下的版本标记，存在且版本一致说明各用户的分片已经生成
+VERSION_FILE = ".version.json"
+
+# 用户列表可排序的字段
+USER_SORT_FIELDS = ("username", "account_count", "pull_count", "data_size", "last_update")
+
+
+def has_account_config(config_path):
+    """配置文件中是否保存了认证信息（新建账号目录时写入的 {} 占位文件不算）"""
+    config = read_json(config_path)
+    return isinstance(config, dict) and bool(config)
+
+
+def _count_pulls(data_file):
+    """流式统计 data.json 中的抽数（仅在重建目录且元数据中没有抽数时使用）"""
+    try:
+        with open(data_file, "rb") as f:
+            return sum(len(record.get("c", [])) for _, record in iter_json_object(f)
+                       if isinstance(record, dict))
+    except (IOError, ValueError):
+        return 0
+
+
+def _user_totals(accounts):
+    """由账号条目汇总用户的账号数、总抽数、数据大小与最近更新时间"""
+    return {
+        "account_count": len(accounts),
+        "pull_count": sum(a.get("pull_count", 0) for a in accounts.values()),
+        "data_size": sum(a.get("data_size", 0) for a in accounts.values()),
+        "last_update": max((a["last_update"] for a in accounts.values() if a.get("last_update")), default=None)
+    }
+
+
+class UserCatalog:
+    """用户与游戏账号目录：按用户分片的 JSON 索引代替对 users 目录的遍历
+
+    每个用户一个分片文件 <目录>/<用户名>.json：{"is_admin", "force_password_change", "totals",
+    "accounts": {游戏UID: {"has_config", "last_update", "pull_count", "data_size"}}}
+
+    修改只在该用户分片的文件锁 (file_lock) 内重新读取并原子写回这一个文件，
+    保存账号数据的开销与用户数无关，也不会丢失其他进程的修改。
+    读取时先比较目录的修改时间（写入分片会替换目录项），变化后只重新加载修改时间变化的分片。
+    索引与实际目录不一致时可以调用 rebuild()（或运行 rebuild_user_catalog.py）从磁盘重建。
+    用户的汇总数据 (totals) 在账号变化时重新计算，管理后台的列表只需排序与切片。
+    """
+
+    def __init__(self, catalog_dir=DEFAULT_CATALOG_DIR, users_base_path=USERS_BASE_PATH):
+        self.catalog_dir = catalog_dir
+        self.users_base_path = users_base_path
+        self.users = {}
+        # 用户名 -> 已加载分片的修改时间
+        self._shard_mtimes = {}
+        self.mtime = None
+        # 当前版本下排好序的用户列表与全站汇总，目录变化后清空
+        self._views = {}
+        self._lock = threading.RLock()
+        if read_json(self._version_path()).get("version") != CATALOG_VERSION:
+            self.rebuild()
+        else:
+            self._refresh()
+
+    def _version_path(self):
+        return os.path.join(self.catalog_dir, VERSION_FILE)
+
+    def _shard_path(self, username):
+        return os.path.join(self.catalog_dir, f"{username}.json")
+
+    def _refresh(self):
+        """目录被其他进程修改过时，重新加载新增或修改过的分片并移除已删除的分片"""
+        mtime = file_mtime(self.catalog_dir)
+        if mtime == self.mtime:
+            return
+        shard_mtimes = {}
+        if mtime is not None:
+            for name in os.listdir(self.catalog_dir):
+                if name.startswith(".") or not name.endswith(".json"):
+                    continue
+                shard_mtime = file_mtime(os.path.join(self.catalog_dir, name))
+                if shard_mtime is not None:
+                    shard_mtimes[name[:-len(".json")]] = shard_mtime
+        for username in set(self.users) - set(shard_mtimes):
+            del self.users[username]
+        for username, shard_mtime in shard_mtimes.items():
+            if self._shard_mtimes.get(username) != shard_mtime:
+                entry = read_json(self._shard_path(username))
+                if entry:
+                    self.users[username] = entry
+        self._shard_mtimes = shard_mtimes
+        self.mtime = mtime
+        self._views = {}
+
+    def _write_shard(self, username, entry):
+        path = self._shard_path(username)
+        if entry is None:
+            if os.path.exists(path):
+                os.remove(path)
+            self.users.pop(username, None)
+            self._shard_mtimes.pop(username, None)
+        else:
+            atomic_write_json(path, entry)
+            self.users[username] = entry
+            self._shard_mtimes[username] = file_mtime(path)
+        self._views = {}
+
+    @contextmanager
+    def transaction(self, username):
+        """在该用户分片的跨进程锁内读取文件中的最新条目、修改并写回
+
+        产出的条目是一个 dict（用户尚未登记时为空 dict）；修改后为空的条目会删除分片。
+        修改过程中出错时不写入。
+        """
+        with self._lock, file_lock(self._shard_path(username)):
+            entry = read_json(self._shard_path(username))
+            yield entry
+            self._write_shard(username, entry or None)
+
+    # --- 查询 ---
+
+    def usernames(self):
+        with self._lock:
+            self._refresh()
+            return sorted(self.users)
+
+    def get_user(self, username):
+        with self._lock:
+            self._refresh()
+            return self.users.get(username)
+
+    def user_accounts(self, username):
+        """用户的游戏UID列表"""
+        entry = self.get_user(username)
+        return sorted(entry["accounts"]) if entry else []
+
+    def list_users(self, sort="username", descending=False, query=None, offset=0, limit=50):
+        """分页返回用户及其汇总数据
+
+        Args:
+            sort: USER_SORT_FIELDS 中的字段
+            query: 用户名包含的子串（不区分大小写）
+
+        Returns:
+            (当前页的用户列表, 符合条件的用户总数)
+        """
+        if sort not in USER_SORT_FIELDS:
+            raise ValueError(f"Unsupported sort: {sort}")
+        with self._lock:
+            self._refresh()
+            key = ("users", sort, descending)
+            rows = self._views.get(key)
+            if rows is None:
+                rows = [self._user_row(username, entry) for username, entry in self.users.items()]
+                rows.sort(key=lambda row: (row[sort] or "", row["username"]) if sort == "last_update"
+                          else (row[sort], row["username"]), reverse=descending)
+                if sort == "last_update":
+                    # 没有更新时间的用户始终排在最后（稳定排序，不影响其余顺序）
+                    rows.sort(key=lambda row: row["last_update"] is None)
+                self._views[key] = rows
+        if query:
+            query = query.lower()
+            rows = [row for row in rows if query in row["username"].lower()]
+        return rows[offset:offset + limit], len(rows)
+
+    @staticmethod
+    def _user_row(username, entry):
+        totals = entry.get("totals") or _user_totals(entry.get("accounts", {}))
+        return {
+            "username": username,
+            "is_admin": entry.get("is_admin", False),
+            "force_password_change": entry.get("force_password_change", False),
+            **totals
+        }
+
+    def summary(self):
+        """全站汇总：用户数、管理员数、待修改密码数、账号数、总抽数、数据大小"""
+        with self._lock:
+            self._refresh()
+            result = self._views.get("summary")
+            if result is None:
+                result = {"users": len(self.users), "admins": 0, "force_password_change": 0,
+                          "accounts": 0, "pull_count": 0, "data_size": 0}
+                for username, entry in self.users.items():
+                    row = self._user_row(username, entry)
+                    result["admins"] += row["is_admin"]
+                    result["force_password_change"] += row["force_password_change"]
+                    result["accounts"] += row["account_count"]
+                    result["pull_count"] += row["pull_count"]
+                    result["data_size"] += row["data_size"]
+                self._views["summary"] = result
+            return result
+
+    def all_accounts(self):
+        """所有账号：[(用户名, 游戏UID, 账号条目)]"""
+        with self._lock:
+            self._refresh()
+            return [(username, game_uid, account)
+                    for username in sorted(self.users)
+                    for game_uid, account in sorted(self.users[username]["accounts"].items())]
+
+    # --- 修改 ---
+
+    def upsert_user(self, username, is_admin=False, force_password_change=False):
+        with self.transaction(username) as entry:
+            entry.setdefault("accounts", {})
+            entry["is_admin"] = is_admin
+            entry["force_password_change"] = force_password_change
+            entry["totals"] = _user_totals(entry["accounts"])
+
+    def remove_user(self, username):
+        with self.transaction(username) as entry:
+            entry.clear()
+
+    def upsert_account(self, username, game_uid, **fields):
+        """登记账号并更新给定字段（has_config、last_update、pull_count、data_size）"""
+        with self.transaction(username) as entry:
+            entry.setdefault("is_admin", False)
+            entry.setdefault("force_password_change", False)
+            account = entry.setdefault("accounts", {}).setdefault(
+                game_uid, {"has_config": False, "last_update": None, "pull_count": 0, "data_size": 0})
+            account.update(fields)
+            entry["totals"] = _user_totals(entry["accounts"])
+
+    def remove_account(self, username, game_uid):
+        with self.transaction(username) as entry:
+            if entry:
+                entry["accounts"].pop(game_uid, None)
+                entry["totals"] = _user_totals(entry["accounts"])
+
+    def _scan(self):
+        """遍历 users 目录生成目录内容"""
+        users = {}
+        if os.path.isdir(self.users_base_path):
+            for username in os.listdir(self.users_base_path):
+                user_dir = os.path.join(self.users_base_path, username)
+                # 跳过目录索引、卡池目录等隐藏文件
+                if username.startswith(".") or not os.path.isdir(user_dir):
+                    continue
+                user_data = read_json(os.path.join(user_dir, "user.json"))
+                if not user_data:
+                    continue
+                accounts = {}
+                accounts_dir = os.path.join(user_dir, "accounts")
+                if os.path.isdir(accounts_dir):
+                    for game_uid in os.listdir(accounts_dir):
+                        account_dir = os.path.join(accounts_dir, game_uid)
+                        if not os.path.isdir(account_dir):
+                            continue
+                        metadata = read_json(os.path.join(account_dir, "metadata.json"))
+                        data_file = os.path.join(account_dir, "data.json")
+                        pull_count = metadata.get("pull_count")
+                        if pull_count is None:
+                            pull_count = _count_pulls(data_file)
+                        accounts[game_uid] = {
+                            "has_config": has_account_config(os.path.join(account_dir, "config.json")),
+                            "last_update": metadata.get("last_update"),
+                            "pull_count": pull_count,
+                            "data_size": os.path.getsize(data_file) if os.path.exists(data_file) else 0
+                        }
+                users[username] = {
+                    "is_admin": user_data.get("is_admin", False),
+                    "force_password_change": user_data.get("force_password_change", False),
+                    "accounts": accounts,
+                    "totals": _user_totals(accounts)
+                }
+        return users
+
+    def rebuild(self):
+        """遍历 users 目录重新生成全部分片（用于首次使用或索引损坏后的恢复）"""
+        with self._lock, file_lock(self._version_path()):
+            users = self._scan()
+            os.makedirs(self.catalog_dir, exist_ok=True)
+            self._refresh()
+            for username in set(self.users) - set(users):
+                with file_lock(self._shard_path(username)):
+                    self._write_shard(username, None)
+            for username, entry in users.items():
+                with file_lock(self._shard_path(username)):
+                    self._write_shard(username, entry)
+            atomic_write_json(self._version_path(), {"version": CATALOG_VERSION})
+        return len(users)
+
+
+_catalogs = {}
+_catalog_lock = threading.Lock()
+
+
+def get_user_catalog(users_base_path=USERS_BASE_PATH):
+    """返回进程内共享的用户目录，首次使用时加载（目录文件不存在时自动重建）
+
+    每个用户数据根目录各有一个目录 (<根目录>/.catalog/)。
+    """
+    key = os.path.normpath(users_base_path)
+    catalog = _catalogs.get(key)
+    if catalog is None:
+        with _catalog_lock:
+            catalog = _catalogs.get(key)
+            if catalog is None:
+                catalog = _catalogs[key] = UserCatalog(os.path.join(users_base_path, ".catalog"),
+                                                       users_base_path)
+    return catalog
+
+
+def touch_account(username, game_uid, last_update=None, users_base_path=USERS_BASE_PATH, **fields):
+    """数据保存后更新账号的最后更新时间及抽数、数据大小等汇总字段"""
+    get_user_catalog(users_base_path).upsert_account(username, game_uid,
+                                                     last_update=last_update or datetime.now().isoformat(), **fields)
@@ -1,6 +1,7 @@
 import os
 import json
 from pathlib import Path
+from user_system.catalog import get_user_catalog, has_account_config
 
 class DirectoryService:
     """用户目录管理服务"""
@@ -19,12 +20,8 @@ class DirectoryService:
     
     @staticmethod
     def get_user_accounts(username):
-        """获取用户的所有游戏账号"""
-        accounts_path = Path(f"users/{username}/accounts/")
-        if not accounts_path.exists():
-            return []
-        
-        return [item.name for item in accounts_path.iterdir() if item.is_dir()]
+        """获取用户的所有游戏账号（来自用户目录索引）"""
+        return get_user_catalog().user_accounts(username)
     
     @staticmethod
     def create_account_directory(username, game_uid):
@@ -49,4 +46,6 @@ class DirectoryService:
                 "version": "1.0"
             }))
         
+        # config.json 此时只是占位文件，保存认证信息后才会被定时更新
+        get_user_catalog().upsert_account(username, game_uid, has_config=has_account_config(str(config_file)))
         return str(account_path)
@@ -1,8 +1,34 @@
 import json
 import os
+import threading
 from pathlib import Path
 from flask_login import UserMixin
 from werkzeug.security import generate_password_hash, check_password_hash
+from user_system.catalog import get_user_catalog
+
+# 进程内的用户信息缓存：用户名 -> (user.json 的修改时间与大小, 用户数据)
+# Flask-Login 每个请求都会加载当前用户，命中缓存时只需一次 stat，不再读取和解析文件
+_user_cache = {}
+_user_cache_lock = threading.Lock()
+
+
+def _file_stamp(path):
+    """文件的 (修改时间, 大小)，文件不存在时返回 None"""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def invalidate_user_cache(username=None):
+    """使用户缓存失效；不指定用户名时清空全部缓存"""
+    with _user_cache_lock:
+        if username is None:
+            _user_cache.clear()
+        else:
+            _user_cache.pop(username, None)
+
 
 class User(UserMixin):
     """用户模型"""
@@ -44,16 +70,33 @@ class User(UserMixin):
         
         with open(self.user_file, 'w', encoding='utf-8') as f:
             json.dump(user_data, f, ensure_ascii=False, indent=2)
+        
+        # 直接以写入的内容更新缓存
+        with _user_cache_lock:
+            _user_cache[self.username] = (_file_stamp(self.user_file), user_data)
+        get_user_catalog().upsert_user(self.username, self.is_admin, self.force_password_change)
     
     @staticmethod
     def get_user(username):
-        """获取用户实例"""
+        """获取用户实例
+
+        用户数据按 user.json 的修改时间与大小缓存在进程内，文件被外部修改后自动重新读取。
+        每次返回新的 User 实例，调用方修改后不会影响缓存。
+        """
         user_file = Path(f"users/{username}/user.json")
-        if not user_file.exists():
+        stamp = _file_stamp(user_file)
+        if stamp is None:
+            invalidate_user_cache(username)
             return None
         
-        with open(user_file, 'r', encoding='utf-8') as f:
-            user_data = json.load(f)
+        cached = _user_cache.get(username)
+        if cached is not None and cached[0] == stamp:
+            user_data = cached[1]
+        else:
+            with open(user_file, 'r', encoding='utf-8') as f:
+                user_data = json.load(f)
+            with _user_cache_lock:
+                _user_cache[username] = (stamp, user_data)
         
         return User(
             username=user_data['username'],
@@ -70,17 +113,12 @@ class User(UserMixin):
     
     @staticmethod
     def get_all_users():
-        """获取所有用户列表"""
-        users_dir = Path("users")
-        if not users_dir.exists():
-            return []
-        
+        """获取所有用户列表（用户名取自用户目录，不遍历 users 目录）"""
         users = []
-        for user_dir in users_dir.iterdir():
-            if user_dir.is_dir():
-                user_file = user_dir / "user.json"
-                if user_file.exists():
-                    users.append(User.get_user(user_dir.name))
+        for username in get_user_catalog().usernames():
+            user = User.get_user(username)
+            if user is not None:
+                users.append(user)
         
         return users
     
@@ -93,4 +131,6 @@ class User(UserMixin):
         if user_dir.exists():
             import shutil
             shutil.rmtree(user_dir)
+        invalidate_user_cache(self.username)
+        get_user_catalog().remove_user(self.username)
         return True
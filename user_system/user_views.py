@@ -1,16 +1,22 @@
-from flask import Blueprint, request, render_template, redirect, url_for, flash, jsonify, abort
+from flask import Blueprint, request, render_template, stream_template, redirect, url_for, flash, jsonify, abort
 from flask_login import login_required, current_user
 from user_system.models import User
 from user_system.directory_service import DirectoryService
 from user_system.middleware import check_user_data_access
 import json
 import os
+import functools
 from pathlib import Path
 from solvers.authenticator import Authenticator
 from solvers.credential_manager import CredentialManager
 from solvers.gacha_data_fetcher import GachaDataFetcher
 from solvers.gacha_data_storer import GachaDataStorer
-from app.api.stats import _get_all_pulls, _calculate_dashboard_summary, _calculate_pool_list_and_latest, _calculate_pool_details, _calculate_pulls_by_pool, _calculate_pulls_by_month
+from app.api.stats import _load_dashboard_summary
+from app.api.combined_stats import load_combined_summary
+from app.api.http_cache import conditional_data_response, get_data_version
+from app.compression import send_precompressed_file
+from app.api.account_cache import invalidate_account
+from user_system.catalog import get_user_catalog
 
 # 创建用户蓝图
 user_bp = Blueprint('user', __name__, url_prefix='/user')
@@ -95,6 +101,7 @@ def add_account(username):
             if not credential_manager.encrypt_and_save_credentials(credentials_to_save, str(config_path)):
                 flash('关键错误：保存加密凭证失败！', 'error')
                 return redirect(url_for('user.add_account', username=username))
+            get_user_catalog().upsert_account(username, game_uid, has_config=True)
             
             flash('凭证已成功加密保存，正在获取数据...', 'info')
 
@@ -131,25 +138,8 @@ def account_detail(username, account_uid):
         flash('账号不存在', 'error')
         abort(404)
     
-    # 读取账号数据
-    config_file = account_path / "config.json"
-    data_file = account_path / "data.json"
+    # 读取账号元数据（抽卡记录由统计 API 按需加载，不在这里读取 data.json）
     metadata_file = account_path / "metadata.json"
-    
-    try:
-        with open(config_file, 'r', encoding='utf-8') as f:
-            config = json.load(f)
-    except:
-        config = {}
-    
-    try:
-        with open(data_file, 'r', encoding='utf-8') as f:
-            # 直接加载JSON文件的内容，它应该是一个以时间戳为键的对象
-            data = json.load(f)
-    except (IOError, json.JSONDecodeError):
-        # 如果文件不存在或为空/格式错误，则data为空字典
-        data = {}
-    
     try:
         with open(metadata_file, 'r', encoding='utf-8') as f:
             metadata = json.load(f)
@@ -157,34 +147,26 @@ def account_detail(username, account_uid):
         # If file is missing or invalid, provide a default dict with correct keys
         metadata = {"created_at": "未知", "last_update": "未知", "version": "N/A"}
 
-    # 获取抽卡统计数据
-    gacha_summary = None
-    pool_data = None
-    latest_pool_details = None
-    pulls_by_pool_data = None
-    pulls_by_month_data = None
+    # 页面骨架立即以流的形式输出，抽卡总览在模板渲染到对应位置时才计算
+    return stream_template('user/account_detail.html',
+                           username=username,
+                           account_uid=account_uid,
+                           metadata=metadata,
+                           load_summary=functools.partial(_load_dashboard_summary, username, account_uid))
 
-    if data:
-        all_pulls, error = _get_all_pulls(username, account_uid)
-        if error is None:
-            gacha_summary = _calculate_dashboard_summary(all_pulls)
-            pool_data = _calculate_pool_list_and_latest(all_pulls)
-            if pool_data and pool_data.get("latest_pool"):
-                latest_pool_details = _calculate_pool_details(all_pulls, pool_data["latest_pool"])
-            pulls_by_pool_data = _calculate_pulls_by_pool(all_pulls)
-            pulls_by_month_data = _calculate_pulls_by_month(all_pulls)
+@user_bp.route('/<username>/dashboard')
+@login_required
+def combined_dashboard(username):
+    """用户全部游戏账号的合并总览与各账号对比"""
+    if not check_user_data_access(username):
+        flash('无权访问该用户数据', 'error')
+        abort(403)
     
-    return render_template('user/account_detail.html',
-                         username=username,
-                         account_uid=account_uid,
-                         config=config,
-                         data=data,
-                         metadata=metadata,
-                         gacha_summary=gacha_summary,
-                         pool_data=pool_data,
-                         latest_pool_details=latest_pool_details,
-                         pulls_by_pool_data=pulls_by_pool_data,
-                         pulls_by_month_data=pulls_by_month_data)
+    # 页面骨架立即以流的形式输出，各账号并行加载与归并在模板渲染到对应位置时才执行
+    return stream_template('user/dashboard.html',
+                           username=username,
+                           accounts=DirectoryService.get_user_accounts(username),
+                           load_combined=functools.partial(load_combined_summary, username))
 
 @user_bp.route('/<username>/update_data/<account_uid>', methods=['POST'])
 @login_required
@@ -236,6 +218,8 @@ def delete_account(username, account_uid):
     try:
         # 递归删除整个账号目录
         shutil.rmtree(account_path)
+        invalidate_account(username, account_uid)
+        get_user_catalog().remove_account(username, account_uid)
         flash(f'游戏账号 {account_uid} 已成功删除', 'success')
     except Exception as e:
         flash(f'删除账号时出错: {str(e)}', 'error')
@@ -257,6 +241,7 @@ def api_accounts(username):
 
 @user_bp.route('/<username>/api/account/<account_uid>/data')
 @login_required
+@conditional_data_response
 def api_account_data(username, account_uid):
     """获取账号数据API"""
     if not check_user_data_access(username):
@@ -266,11 +251,12 @@ def api_account_data(username, account_uid):
     if not account_path.exists():
         return jsonify({'error': '账号不存在'}), 404
     
-    # 读取数据文件
+    # data.json 本身就是完整的 JSON 导出，直接发送文件（按数据版本缓存压缩结果）
     data_file = account_path / "data.json"
+    version, _ = get_data_version(username, account_uid)
+    if version is None:
+        return jsonify({'error': '读取数据失败'}), 500
     try:
-        with open(data_file, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        return jsonify(data)
-    except:
+        return send_precompressed_file(data_file, version, 'application/json')
+    except OSError:
         return jsonify({'error': '读取数据失败'}), 500